@@ -0,0 +1,18 @@
+from pathlib import Path
+from functools import lru_cache
+from specialsitsai.manifest import FilingManifest, MAPPER_FILENAME
+from app.core.config import get_settings
+
+settings = get_settings()
+
+@lru_cache()
+def get_manifest(dataset: str) -> FilingManifest:
+    """Process-wide filing manifest of a dataset folder (e.g. ``db_oddlots``)."""
+    base_path = Path(settings.BASE_PATH) / dataset
+    return FilingManifest(str(base_path / "html"), mapper_path=str(base_path / MAPPER_FILENAME))
+
+def get_mapper(dataset: str) -> dict:
+    """The dataset's ticker mapper, re-read from disk only when the file has changed."""
+    manifest = get_manifest(dataset)
+    manifest.refresh_mapper()
+    return manifest.mapper
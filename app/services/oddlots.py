@@ -1,20 +1,12 @@
-from pathlib import Path
 from fastapi import HTTPException
-import json
-from app.core.config import get_settings
-
-settings = get_settings()
+from app.services.manifest import get_manifest, get_mapper
 
 async def get_oddlots_summary():
     try:
-        base_path = Path(settings.BASE_PATH)
-        json_path = base_path / "db_oddlots" / "join_html_mapper.json"
-        
-        if not json_path.exists():
+        if not get_manifest("db_oddlots").has_mapper:
             raise HTTPException(status_code=404, detail="Mapper file not found")
             
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+        data = get_mapper("db_oddlots")
             
         return {
             "total_files": len(data),
@@ -34,14 +26,10 @@ async def get_oddlots_summary():
 async def get_oddlot_details(ticker: str):
     """Get specific details for a ticker from oddlots dataset"""
     try:
-        base_path = Path(settings.BASE_PATH)
-        json_path = base_path / "db_oddlots" / "join_html_mapper.json"
-        
-        if not json_path.exists():
+        if not get_manifest("db_oddlots").has_mapper:
             raise HTTPException(status_code=404, detail="Mapper file not found")
             
-        with open(json_path, 'r') as f:
-            data = json.load(f)
+        data = get_mapper("db_oddlots")
             
         if ticker not in data:
             raise HTTPException(status_code=404, detail=f"Ticker {ticker} not found in oddlots")
@@ -9,9 +9,7 @@ if __name__ == "__main__":
     oddlot_folder = "/Users/ignaciomoyaredondo/OneDrive/obsidian/01_projects/secedgarspecial/db_oddlots/html"
     
     # Parse the HTML files
-    html_files = ssai.HTMLHandler(oddlot_folder).process_html_files()
-    #html_file = [file for file in html_files if "MNST" in file["source"]]
-    html_file = [file for file in html_files if "MNST" in file["source"]]
+    html_file = list(ssai.HTMLHandler(oddlot_folder).iter_html_files(ticker="MNST"))
     #MSCF not reading well
     
 
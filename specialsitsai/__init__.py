@@ -2,5 +2,7 @@ from specialsitsai.db import HTMLHandler
 from specialsitsai.rag import RAGSystem
 from specialsitsai.chatbot import Chatbot
 from specialsitsai.oddlots import ODD_LOT_QUESTIONS
+from specialsitsai.spinoffs import SPINOFF_QUESTIONS
+from specialsitsai.batch import BatchRunner
 
-__all__ = ["HTMLHandler", "RAGSystem", "Chatbot", "ODD_LOT_QUESTIONS"]
\ No newline at end of file
+__all__ = ["HTMLHandler", "RAGSystem", "Chatbot", "ODD_LOT_QUESTIONS", "SPINOFF_QUESTIONS", "BatchRunner"]
\ No newline at end of file
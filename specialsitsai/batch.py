@@ -0,0 +1,139 @@
+import os
+import json
+import time
+import threading
+from datetime import date, datetime
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Dict, List, Optional, Set
+import structlog
+from pydantic import BaseModel
+
+from specialsitsai.db import HTMLHandler
+from specialsitsai.rag import RAGSystem
+
+logger = structlog.get_logger(__name__)
+
+
+def to_json(value: Any) -> Any:
+    """``json.dumps`` fallback for parsed answers: pydantic models and datetimes."""
+    if isinstance(value, BaseModel):
+        return value.model_dump()
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+class BatchRunner:
+    """Answer a question set for every ticker (or filing) of a folder, streaming results to JSONL.
+
+    Each unit gets its own ``RAGSystem`` built with ``rag_kwargs`` and units run on a pool of
+    ``max_workers`` threads. Every finished unit is appended to ``output_path`` as one line, which
+    doubles as the checkpoint: a rerun skips the units already there. Failed units are written to
+    ``<output_path>.errors.jsonl`` and retried on the next run.
+    """
+
+    def __init__(self,
+                 handler: HTMLHandler,
+                 questions: dict,
+                 output_path: str,
+                 unit: str = "ticker",
+                 max_workers: int = 4,
+                 fused: bool = False,
+                 rag_kwargs: Optional[Dict[str, Any]] = None):
+        if unit not in ("ticker", "filing"):
+            raise ValueError(f"Unknown batch unit {unit!r}, expected 'ticker' or 'filing'")
+        self.handler = handler
+        self.questions = questions
+        self.output_path = output_path
+        self.errors_path = f"{output_path}.errors.jsonl"
+        self.unit = unit
+        self.max_workers = max_workers
+        self.fused = fused
+        self.rag_kwargs = rag_kwargs or {}
+        self._lock = threading.Lock()
+
+    def units(self) -> List[str]:
+        """Tickers (from the manifest, else the filenames, see ``HTMLHandler.ticker_of``) or filenames to process."""
+        filenames = list(self.handler._candidate_files())
+        if self.unit == "filing":
+            return sorted(filenames)
+        if self.handler.manifest is not None and self.handler.manifest.has_mapper:
+            return self.handler.manifest.tickers()
+        return sorted({self.handler.ticker_of(filename) for filename in filenames} - {None})
+
+    def completed(self) -> Set[str]:
+        """Units with a result in the output file; a line cut short by a crash is ignored."""
+        done = set()
+        if not os.path.exists(self.output_path):
+            return done
+        with open(self.output_path, 'r', encoding='utf-8') as file:
+            for line in file:
+                try:
+                    done.add(json.loads(line)[self.unit])
+                except (ValueError, KeyError):
+                    continue
+        return done
+
+    def _documents(self, unit: str) -> List[Dict[str, str]]:
+        if self.unit == "ticker":
+            documents = self.handler.iter_html_files(ticker=unit)
+        else:
+            documents = self.handler.iter_html_files(predicate=lambda filename: filename == unit)
+        # Files that failed to parse come back empty and would only be answered from nothing.
+        return [document for document in documents if document["page_content"]]
+
+    def _append(self, path: str, record: Dict[str, Any]):
+        line = json.dumps(record, default=to_json)
+        with self._lock:
+            with open(path, 'a', encoding='utf-8') as file:
+                file.write(line + "\n")
+                file.flush()
+                os.fsync(file.fileno())
+
+    def run_unit(self, unit: str) -> Dict[str, Any]:
+        documents = self._documents(unit)
+        if not documents:
+            raise ValueError(f"No parsed documents for {self.unit} {unit}")
+        rag = RAGSystem(documents, **self.rag_kwargs)
+        try:
+            answers = rag.query_questions(self.questions, fused=self.fused)
+        finally:
+            rag.close()
+        return {self.unit: unit, "sources": [document["source"] for document in documents], "answers": answers}
+
+    def run(self, units: Optional[List[str]] = None) -> Dict[str, Any]:
+        """Process the units not completed yet; returns counts and throughput."""
+        units = self.units() if units is None else units
+        done = self.completed()
+        pending = [unit for unit in units if unit not in done]
+        logger.info("Starting batch", unit=self.unit, total=len(units), skipped=len(units) - len(pending))
+        start = time.perf_counter()
+        succeeded = failed = 0
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            futures = {executor.submit(self.run_unit, unit): unit for unit in pending}
+            for future in as_completed(futures):
+                unit = futures[future]
+                try:
+                    self._append(self.output_path, future.result())
+                    succeeded += 1
+                except Exception as e:
+                    logger.error("Batch unit failed", unit=unit, error=str(e))
+                    self._append(self.errors_path, {self.unit: unit, "error": str(e)})
+                    failed += 1
+                elapsed = time.perf_counter() - start
+                logger.info(
+                    "Batch progress",
+                    done=succeeded + failed,
+                    total=len(pending),
+                    errors=failed,
+                    units_per_minute=round(60 * (succeeded + failed) / elapsed, 2) if elapsed else None,
+                )
+        stats = {
+            "total": len(units),
+            "skipped": len(units) - len(pending),
+            "succeeded": succeeded,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - start, 3),
+        }
+        logger.info("Finished batch", **stats)
+        return stats
@@ -0,0 +1,154 @@
+import os
+import sys
+import time
+import tempfile
+from typing import Dict, List, Optional, Sequence
+import structlog
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from specialsitsai.index import ChromaIndex, chunk_id, embedding_model_id
+from specialsitsai.vectorindex import NumpyIndex
+from specialsitsai.parsers import available_backends, get_backend, normalize_whitespace, text_similarity
+
+logger = structlog.get_logger(__name__)
+
+
+def benchmark_html_backends(filepaths: Sequence[str],
+                            backends: Optional[List[str]] = None,
+                            reference: str = "bs4",
+                            repeats: int = 1) -> Dict[str, Dict[str, float]]:
+    """Time each HTML backend over ``filepaths`` and compare its text with the reference backend.
+
+    Returns, per backend, the throughput in MB/s and files/s plus the lowest per-file
+    ``text_similarity`` against ``reference`` (1.0 means every file extracted the same words).
+    """
+    documents = []
+    for filepath in filepaths:
+        with open(filepath, 'r', encoding='utf-8') as file:
+            documents.append(file.read())
+    total_mb = sum(len(document.encode('utf-8')) for document in documents) / 1024 ** 2
+    reference_texts = [
+        normalize_whitespace(get_backend(reference).extract_text(document)) for document in documents
+    ]
+
+    results = {}
+    for name in backends or available_backends():
+        backend = get_backend(name)
+        start = time.perf_counter()
+        for _ in range(repeats):
+            texts = [normalize_whitespace(backend.extract_text(document)) for document in documents]
+        elapsed = (time.perf_counter() - start) / repeats
+        results[name] = {
+            "seconds": elapsed,
+            "mb_per_second": total_mb / elapsed if elapsed else float("inf"),
+            "files_per_second": len(documents) / elapsed if elapsed else float("inf"),
+            "min_similarity": min(
+                (text_similarity(ref, text) for ref, text in zip(reference_texts, texts)), default=1.0
+            ),
+        }
+        logger.info("Benchmarked HTML backend", backend=name, **results[name])
+    return results
+
+
+def select_html_backend(filepaths: Sequence[str], min_similarity: float = 0.999, **kwargs) -> str:
+    """Pick the fastest backend whose output stays faithful to the reference on ``filepaths``."""
+    results = benchmark_html_backends(filepaths, **kwargs)
+    faithful = [name for name, result in results.items() if result["min_similarity"] >= min_similarity]
+    return min(faithful, key=lambda name: results[name]["seconds"], default=kwargs.get("reference", "bs4"))
+
+
+VECTOR_BENCHMARK_BACKENDS = {"chroma": ChromaIndex, "numpy": NumpyIndex}
+
+
+def rss_bytes() -> int:
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as file:
+            return int(file.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # ru_maxrss is in bytes on macOS and kilobytes elsewhere.
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def benchmark_vector_backends(documents: List[Document],
+                              embedding: Embeddings,
+                              queries: Sequence[str],
+                              k: int = 4,
+                              backends: Optional[List[str]] = None,
+                              persist: bool = False) -> Dict[str, Dict[str, float]]:
+    """Compare vector index backends on the same precomputed embeddings.
+
+    Returns, per backend, the seconds to build the index, the mean latency of a ``k``-nearest
+    query in milliseconds (query embeddings are computed beforehand, so only the search is
+    timed) and the growth of the process RSS while building, in MB.
+    """
+    model_id = embedding_model_id(embedding)
+    ids = [chunk_id(document.page_content, model_id) for document in documents]
+    vectors = embedding.embed_documents([document.page_content for document in documents])
+    query_vectors = [embedding.embed_query(query) for query in queries]
+
+    results = {}
+    for name in backends or list(VECTOR_BENCHMARK_BACKENDS):
+        with tempfile.TemporaryDirectory() as directory:
+            rss_before = rss_bytes()
+            start = time.perf_counter()
+            index = VECTOR_BENCHMARK_BACKENDS[name](
+                embedding, model_id, persist_directory=directory if persist else None,
+                collection_prefix=f"benchmark-{time.time_ns()}",
+            )
+            index.add(ids, documents, embeddings=vectors)
+            build_seconds = time.perf_counter() - start
+            rss_mb = (rss_bytes() - rss_before) / 1024 ** 2
+
+            start = time.perf_counter()
+            for vector in query_vectors:
+                if isinstance(index, NumpyIndex):
+                    index.search_by_vectors([vector], k)
+                else:
+                    index.store.similarity_search_by_vector_with_relevance_scores(vector, k=k)
+            latency_ms = 1000 * (time.perf_counter() - start) / max(len(query_vectors), 1)
+            if isinstance(index, ChromaIndex):
+                index.store.delete_collection()
+        results[name] = {"build_seconds": build_seconds, "query_ms": latency_ms, "rss_mb": rss_mb}
+        logger.info("Benchmarked vector backend", backend=name, chunks=len(documents), **results[name])
+    return results
+
+
+# Fixed documents covering the constructs where parsers tend to disagree.
+SAMPLE_DOCUMENTS: Dict[str, str] = {
+    "plain": "<html><head><title>Offer</title></head><body><p>Holders of fewer than <b>100</b> shares.</p></body></html>",
+    "entities": "<p>Price &amp; terms: $1.00&nbsp;to&#160;$2.00 &lt;per share&gt;</p>",
+    "skipped": "<style>p {color: red}</style><script>var x = '<p>no</p>';</script>kept<template>hidden</template> text",
+    "comment": "<p>visible<!-- hidden comment --> text</p>",
+    "no_elements": "<!-- only a comment -->",
+    "cdata": "<div>before <![CDATA[inside cdata]]> after</div>",
+    "textarea": "<form><textarea name=q>Terms <b>not bold</b> &amp; more</textarea></form><p>after</p>",
+    "raw_text": "<head><title>A <b>b</b> &amp; c</title></head><body><xmp>x <i>y</i></xmp>z</body>",
+    "edgar": "<DOCUMENT><TYPE>SC TO-I<SEQUENCE>1<TEXT><html><body><p>Tender offer</p></body></html></TEXT></DOCUMENT>",
+    "table": "<table><tr><td>Lower</td><td>$1.00</td></tr><tr><td>Higher</td><td>$2.00</td></tr></table>",
+}
+
+
+def check_backend_equivalence(backends: Optional[List[str]] = None, reference: str = "bs4") -> Dict[str, List[str]]:
+    """Names of the ``SAMPLE_DOCUMENTS`` on which each backend's normalized text differs from ``reference``."""
+    expected = {
+        name: normalize_whitespace(get_backend(reference).extract_text(document))
+        for name, document in SAMPLE_DOCUMENTS.items()
+    }
+    return {
+        backend: [
+            name for name, document in SAMPLE_DOCUMENTS.items()
+            if normalize_whitespace(get_backend(backend).extract_text(document)) != expected[name]
+        ]
+        for backend in (backends or [name for name in available_backends() if name != reference])
+    }
+
+
+if __name__ == "__main__":
+    mismatches = check_backend_equivalence()
+    for backend, names in mismatches.items():
+        print(f"{backend}: {'ok' if not names else 'differs on ' + ', '.join(names)}")
+    sys.exit(1 if any(mismatches.values()) else 0)
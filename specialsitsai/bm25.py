@@ -0,0 +1,135 @@
+import re
+import math
+from typing import Any, Dict, List, Optional, Tuple
+import numpy as np
+import structlog
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.retrievers import BaseRetriever
+
+from specialsitsai.index import metadata_matches
+
+logger = structlog.get_logger(__name__)
+
+# Dollar signs and numbers are kept as terms: prices and dates are what filings get asked about.
+TOKEN_PATTERN = re.compile(r'\$|\d+(?:[.,]\d+)*%?|[a-z]+')
+
+
+def tokenize(text: str) -> List[str]:
+    return [token.replace(',', '') for token in TOKEN_PATTERN.findall(text.lower())]
+
+
+def chunk_key(document: Document) -> Tuple:
+    """Identity of a chunk across retrievers: its source and offsets, else its source and text."""
+    metadata = document.metadata
+    if metadata.get("start") is not None and metadata.get("end") is not None:
+        return (metadata.get("source", ""), metadata["start"], metadata["end"])
+    return (metadata.get("source", ""), document.page_content)
+
+
+class BM25Index:
+    """In-memory inverted index scoring documents with Okapi BM25.
+
+    Postings hold, per term, the positions of the documents containing it and the term counts,
+    so a query only touches the documents sharing one of its terms.
+    """
+
+    def __init__(self, documents: List[Document], k1: float = 1.5, b: float = 0.75):
+        self.documents = documents
+        self.k1 = k1
+        self.b = b
+        postings: Dict[str, Dict[int, int]] = {}
+        lengths = np.zeros(len(documents), dtype=np.float32)
+        for position, document in enumerate(documents):
+            tokens = tokenize(document.page_content)
+            lengths[position] = len(tokens)
+            for token in tokens:
+                counts = postings.setdefault(token, {})
+                counts[position] = counts.get(position, 0) + 1
+        average_length = float(lengths.mean()) if len(documents) and lengths.mean() else 1.0
+        # Per-document part of the BM25 denominator, computed once.
+        self._norms = k1 * (1 - b + b * lengths / average_length)
+        self._postings: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.fromiter(counts.keys(), dtype=np.int64, count=len(counts)),
+                   np.fromiter(counts.values(), dtype=np.float32, count=len(counts)))
+            for term, counts in postings.items()
+        }
+        n = len(documents)
+        self._idf = {
+            term: math.log(1 + (n - len(positions) + 0.5) / (len(positions) + 0.5))
+            for term, (positions, _) in self._postings.items()
+        }
+        logger.debug("Built BM25 index", documents=n, terms=len(self._postings))
+
+    def __len__(self) -> int:
+        return len(self.documents)
+
+    def scores(self, query: str) -> np.ndarray:
+        scores = np.zeros(len(self.documents), dtype=np.float32)
+        for term in set(tokenize(query)):
+            if term not in self._postings:
+                continue
+            positions, counts = self._postings[term]
+            scores[positions] += self._idf[term] * counts * (self.k1 + 1) / (counts + self._norms[positions])
+        return scores
+
+    def search(self,
+               query: str,
+               k: int = 4,
+               filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        """Best ``k`` documents matching ``filters`` and sharing at least one term with the query."""
+        scores = self.scores(query)
+        if filters:
+            mask = np.fromiter(
+                (metadata_matches(document.metadata, filters) for document in self.documents),
+                dtype=bool, count=len(self.documents),
+            )
+            scores[~mask] = 0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(-scores[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return [(self.documents[i], float(scores[i])) for i in candidates]
+
+
+class BM25Retriever(BaseRetriever):
+    """Retriever over a ``BM25Index``; needs no embedding call."""
+
+    index: BM25Index
+    k: int = 4
+    filters: Optional[Dict[str, Any]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [document for document, _ in self.index.search(query, self.k, self.filters)]
+
+
+class HybridRetriever(BaseRetriever):
+    """Fuse the rankings of several retrievers with reciprocal rank fusion and keep the best ``k``.
+
+    A chunk scores ``sum(1 / (rrf_k + rank))`` over the rankings it appears in, so chunks found
+    both lexically and by similarity rise to the top without calibrating the two scores. Chunks
+    are matched by source and offsets, since a contextualized dense hit and its plain lexical hit
+    differ in text; the first retriever's copy is returned.
+    """
+
+    retrievers: List[BaseRetriever]
+    k: int = 4
+    rrf_k: int = 60
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        scores: Dict[Tuple, float] = {}
+        documents: Dict[Tuple, Document] = {}
+        for retriever in self.retrievers:
+            ranked = retriever.invoke(query, config={"callbacks": run_manager.get_child()})
+            for rank, document in enumerate(ranked, start=1):
+                key = chunk_key(document)
+                documents.setdefault(key, document)
+                scores[key] = scores.get(key, 0.0) + 1 / (self.rrf_k + rank)
+        best = sorted(scores, key=scores.get, reverse=True)[:self.k]
+        return [documents[key] for key in best]
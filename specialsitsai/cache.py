@@ -0,0 +1,152 @@
+import os
+import sqlite3
+import hashlib
+import tempfile
+import threading
+from typing import Dict, Optional, Union
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class HitCounter:
+    """Thread-safe hit and miss counters behind the caches' ``stats()``."""
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._counter_lock = threading.Lock()
+
+    def record(self, hits: int = 0, misses: int = 0):
+        with self._counter_lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+class SQLiteLRUCache:
+    """One SQLite table (WAL mode, shareable across threads and processes) evicted least recently used.
+
+    Subclasses name the ``table`` and give its column ``schema``, which must include a
+    ``last_access`` time. Once the table holds more than ``max_entries`` rows the least recently
+    accessed are deleted down to 90%, so the next insert does not trigger eviction again.
+    """
+
+    table: str = ""
+    schema: str = ""
+
+    def __init__(self, path: str, max_entries: int):
+        super().__init__()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.path = path
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(f"CREATE TABLE IF NOT EXISTS {self.table} ({self.schema})")
+        self._conn.execute(f"CREATE INDEX IF NOT EXISTS {self.table}_last_access ON {self.table} (last_access)")
+        self._conn.commit()
+
+    def _evict(self):
+        """Trim the table to ``max_entries``; call with ``_lock`` held, before committing an insert."""
+        count = self._conn.execute(f"SELECT COUNT(*) FROM {self.table}").fetchone()[0]
+        if count <= self.max_entries:
+            return
+        excess = count - int(self.max_entries * 0.9)
+        self._conn.execute(
+            f"DELETE FROM {self.table} WHERE rowid IN "
+            f"(SELECT rowid FROM {self.table} ORDER BY last_access LIMIT ?)",
+            (excess,),
+        )
+        logger.info("Evicted cache entries", path=self.path, table=self.table, count=excess)
+
+    def clear(self):
+        with self._lock:
+            self._conn.execute(f"DELETE FROM {self.table}")
+            self._conn.commit()
+
+
+class DiskCache(HitCounter):
+    """Content-addressed text cache on disk, one file per key, evicted LRU by total size."""
+
+    def __init__(self, directory: str, max_bytes: int = 2 * 1024 ** 3):
+        super().__init__()
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.evictions = 0
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+        self._size_bytes = sum(os.path.getsize(path) for path in self._entry_paths())
+
+    @staticmethod
+    def make_key(*parts: Union[str, bytes]) -> str:
+        """Hash the given parts into a hex cache key."""
+        digest = hashlib.sha256()
+        for part in parts:
+            digest.update(part.encode("utf-8") if isinstance(part, str) else part)
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.txt")
+
+    def _entry_paths(self):
+        for root, _, files in os.walk(self.directory):
+            for filename in files:
+                if filename.endswith(".txt"):
+                    yield os.path.join(root, filename)
+
+    def get(self, key: str) -> Optional[str]:
+        """Return the cached text for ``key`` or None, refreshing its LRU position on a hit."""
+        path = self._path(key)
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                text = file.read()
+            os.utime(path)
+        except FileNotFoundError:
+            self.record(misses=1)
+            return None
+        self.record(hits=1)
+        return text
+
+    def put(self, key: str, text: str):
+        """Store ``text`` under ``key`` and evict the least recently used entries if over budget."""
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        previous_size = os.path.getsize(path) if os.path.exists(path) else 0
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(text)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self._size_bytes += os.path.getsize(path) - previous_size
+            if self._size_bytes > self.max_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove the oldest entries until the cache is back under 90% of ``max_bytes``."""
+        target = int(self.max_bytes * 0.9)
+        entries = sorted(
+            (os.path.getmtime(path), os.path.getsize(path), path) for path in self._entry_paths()
+        )
+        for _, size, path in entries:
+            if self._size_bytes <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                continue
+            self._size_bytes -= size
+            self.evictions += 1
+        logger.info("Evicted cache entries", directory=self.directory, size_bytes=self._size_bytes)
+
+    def stats(self) -> Dict[str, Union[int, float]]:
+        """Report hits, misses, hit rate, evictions and current size."""
+        return {**super().stats(), "evictions": self.evictions, "size_bytes": self._size_bytes}
@@ -0,0 +1,111 @@
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Pattern, Tuple
+from langchain.schema import Document
+
+# "Item 1.", "ITEM 1A.", "Item 7:" headings of 10-K, Form 10 and Schedule TO filings.
+SECTION_PATTERN = re.compile(r'(?:^|(?<=[\s.:;]))(?:ITEM|Item)\s+(\d{1,2}[A-Za-z]?)[.:]\s')
+
+
+class Span(NamedTuple):
+    """A chunk as offsets into a document's text, without copying it."""
+    doc_id: str
+    start: int
+    end: int
+    section: str
+
+
+class SectionChunker:
+    """Split filing text into ``Span``s that never cross an SEC item/section boundary.
+
+    Short consecutive sections (tables of contents, one-line items) are packed together up to
+    ``chunk_size`` characters, a fragment shorter than the overlap leads into the next section,
+    and long sections are cut into overlapping windows that end on a
+    sentence or word boundary.
+    """
+
+    def __init__(self,
+                 chunk_size: int = 2000,
+                 chunk_overlap: int = 300,
+                 section_pattern: Pattern = SECTION_PATTERN):
+        if chunk_overlap >= chunk_size:
+            raise ValueError("chunk_overlap must be smaller than chunk_size")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.section_pattern = section_pattern
+
+    def sections(self, text: str) -> List[Tuple[int, int, str]]:
+        """(start, end, label) of every section, the text before the first item being the preamble."""
+        starts = [(0, "preamble")]
+        for match in self.section_pattern.finditer(text):
+            if match.start() > starts[-1][0]:
+                starts.append((match.start(), f"Item {match.group(1).upper()}"))
+            else:
+                starts[-1] = (match.start(), f"Item {match.group(1).upper()}")
+        bounds = [start for start, _ in starts[1:]] + [len(text)]
+        return [(start, end, label) for (start, label), end in zip(starts, bounds) if end > start]
+
+    def split_text(self, doc_id: str, text: str) -> List[Span]:
+        spans = []
+        group_start, group_end, group_label = None, None, None
+        for start, end, label in self.sections(text):
+            if group_start is not None and end - group_start <= self.chunk_size:
+                group_end = end
+                continue
+            if group_start is not None and group_end - group_start < self.chunk_overlap:
+                # Too short to stand alone (a cover title, a bare heading): lead into the next section.
+                group_end, group_label = end, label
+                continue
+            if group_start is not None:
+                spans.extend(self._windows(doc_id, text, group_start, group_end, group_label))
+            group_start, group_end, group_label = start, end, label
+        if group_start is not None:
+            spans.extend(self._windows(doc_id, text, group_start, group_end, group_label))
+        return spans
+
+    def _windows(self, doc_id: str, text: str, start: int, end: int, section: str) -> Iterator[Span]:
+        pos = start
+        while pos < end:
+            while pos < end and text[pos].isspace():
+                pos += 1
+            if pos >= end:
+                break
+            limit = min(pos + self.chunk_size, end)
+            cut = limit
+            if limit < end:
+                sentence_end = text.rfind('. ', pos + self.chunk_size // 2, limit)
+                if sentence_end != -1:
+                    cut = sentence_end + 1
+                else:
+                    word_end = text.rfind(' ', pos + 1, limit)
+                    cut = word_end if word_end != -1 else limit
+            yield Span(doc_id, pos, cut, section)
+            if cut >= end:
+                break
+            # Start the overlap on a word boundary so no chunk begins mid-word.
+            next_pos = max(cut - self.chunk_overlap, pos + 1)
+            space = text.find(' ', next_pos, cut)
+            pos = space + 1 if space != -1 else cut
+
+    def split_documents(self, documents: Iterable[Document]) -> List[Span]:
+        return [
+            span
+            for document in documents
+            for span in self.split_text(document.metadata["source"], document.page_content)
+        ]
+
+
+def materialize(spans: Iterable[Span],
+                texts: Dict[str, str],
+                metadata: Optional[Dict[str, Dict]] = None) -> Iterator[Document]:
+    """Turn spans into Documents, slicing each chunk string out of the shared texts only now."""
+    for span in spans:
+        yield Document(
+            page_content=texts[span.doc_id][span.start:span.end],
+            metadata={
+                **(metadata or {}).get(span.doc_id, {}),
+                "source": span.doc_id,
+                "start": span.start,
+                "end": span.end,
+                "section": span.section,
+            },
+        )
@@ -0,0 +1,85 @@
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_community.embeddings import OllamaEmbeddings
+from langchain_community.llms import Ollama
+
+_lock = threading.Lock()
+_clients: Dict[Tuple[str, str, str], Any] = {}
+_http_client: Optional[httpx.Client] = None
+_async_http_client: Optional[httpx.AsyncClient] = None
+
+HTTP_LIMITS = httpx.Limits(max_connections=100, max_keepalive_connections=20, keepalive_expiry=30)
+HTTP_TIMEOUT = httpx.Timeout(120.0, connect=10.0)
+
+
+def get_http_client() -> httpx.Client:
+    """Process-wide keep-alive connection pool shared by the OpenAI clients."""
+    global _http_client
+    with _lock:
+        if _http_client is None:
+            _http_client = httpx.Client(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        return _http_client
+
+
+def get_async_http_client() -> httpx.AsyncClient:
+    global _async_http_client
+    with _lock:
+        if _async_http_client is None:
+            _async_http_client = httpx.AsyncClient(limits=HTTP_LIMITS, timeout=HTTP_TIMEOUT)
+        return _async_http_client
+
+
+def _get_or_create(key: Tuple[str, str, str], create):
+    with _lock:
+        client = _clients.get(key)
+    if client is None:
+        client = create()
+        with _lock:
+            # Another thread may have won the race; keep the first client.
+            client = _clients.setdefault(key, client)
+    return client
+
+
+def get_llm(provider: str, model: str):
+    """Shared LLM client for ``provider`` ("ollama" or "openai") and ``model``."""
+    if provider == "ollama":
+        return _get_or_create(("llm", provider, model), lambda: Ollama(model=model))
+    if provider == "openai":
+        return _get_or_create(("llm", provider, model), lambda: ChatOpenAI(
+            model=model,
+            http_client=get_http_client(),
+            http_async_client=get_async_http_client(),
+        ))
+    raise ValueError(f"Unknown LLM provider {provider!r}")
+
+
+def get_embeddings(provider: str, model: Optional[str] = None):
+    """Shared embeddings client for ``provider`` ("ollama" or "openai") and ``model``."""
+    if provider == "ollama":
+        return _get_or_create(("embeddings", provider, model or ""), lambda: OllamaEmbeddings(model=model))
+    if provider == "openai":
+        def create():
+            kwargs = {"model": model} if model else {}
+            return OpenAIEmbeddings(
+                openai_api_key=os.getenv("OPENAI_API_KEY"),
+                http_client=get_http_client(),
+                http_async_client=get_async_http_client(),
+                **kwargs,
+            )
+        return _get_or_create(("embeddings", provider, model or ""), create)
+    raise ValueError(f"Unknown embeddings provider {provider!r}")
+
+
+def clear_clients():
+    """Forget every pooled client and close the shared connection pool."""
+    global _http_client, _async_http_client
+    with _lock:
+        _clients.clear()
+        if _http_client is not None:
+            _http_client.close()
+        _http_client = None
+        # The async pool has to be closed from an event loop; dropping it releases the sockets.
+        _async_http_client = None
@@ -0,0 +1,112 @@
+import time
+import random
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Callable, List, Optional, Sequence, Tuple, Type, TypeVar
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+class RateLimiter:
+    """Thread-safe token-bucket limiter for requests and tokens per minute.
+
+    Share one instance between everything that calls the same provider so the limits hold for
+    the process as a whole.
+    """
+
+    def __init__(self, requests_per_minute: Optional[int] = None, tokens_per_minute: Optional[int] = None):
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._requests = float(requests_per_minute or 0)
+        self._tokens = float(tokens_per_minute or 0)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        elapsed = now - self._updated
+        self._updated = now
+        if self.requests_per_minute:
+            self._requests = min(self.requests_per_minute, self._requests + elapsed * self.requests_per_minute / 60)
+        if self.tokens_per_minute:
+            self._tokens = min(self.tokens_per_minute, self._tokens + elapsed * self.tokens_per_minute / 60)
+
+    def acquire(self, tokens: int = 0):
+        """Block until one request of ``tokens`` tokens fits in both budgets, then consume it."""
+        if self.tokens_per_minute:
+            tokens = min(tokens, self.tokens_per_minute)
+        while True:
+            with self._lock:
+                self._refill()
+                wait = 0.0
+                if self.requests_per_minute and self._requests < 1:
+                    wait = max(wait, (1 - self._requests) * 60 / self.requests_per_minute)
+                if self.tokens_per_minute and self._tokens < tokens:
+                    wait = max(wait, (tokens - self._tokens) * 60 / self.tokens_per_minute)
+                if not wait:
+                    if self.requests_per_minute:
+                        self._requests -= 1
+                    if self.tokens_per_minute:
+                        self._tokens -= tokens
+                    return
+            time.sleep(wait)
+
+
+def call_with_retries(fn: Callable[[], R],
+                      retries: int = 3,
+                      backoff: float = 1.0,
+                      retry_on: Tuple[Type[BaseException], ...] = (Exception,)) -> R:
+    """Call ``fn``, retrying failures with exponential backoff and jitter."""
+    for attempt in range(retries + 1):
+        try:
+            return fn()
+        except retry_on as e:
+            if attempt == retries:
+                raise
+            delay = backoff * 2 ** attempt * (1 + random.random())
+            logger.warning("Retrying failed call", attempt=attempt + 1, delay=round(delay, 2), error=str(e))
+            time.sleep(delay)
+
+
+def run_concurrently(fn: Callable[[T], R],
+                     items: Sequence[T],
+                     max_workers: int = 8,
+                     rate_limiter: Optional[RateLimiter] = None,
+                     cost: Optional[Callable[[T], int]] = None,
+                     retries: int = 3,
+                     backoff: float = 1.0,
+                     description: str = "Running tasks",
+                     on_progress: Optional[Callable[[int, int], None]] = None) -> List[R]:
+    """Map ``fn`` over ``items`` in a thread pool and return the results in input order.
+
+    Every attempt first takes its ``cost(item)`` tokens from ``rate_limiter``; failures are retried
+    with backoff, and progress is logged about every 10% (and passed to ``on_progress``).
+    """
+    total = len(items)
+    results: List[Optional[R]] = [None] * total
+    if not total:
+        return []
+
+    def attempt(item: T) -> R:
+        if rate_limiter is not None:
+            rate_limiter.acquire(cost(item) if cost else 0)
+        return fn(item)
+
+    start = time.perf_counter()
+    log_every = max(1, total // 10)
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(call_with_retries, lambda item=item: attempt(item), retries, backoff): i
+            for i, item in enumerate(items)
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            results[futures[future]] = future.result()
+            if on_progress is not None:
+                on_progress(done, total)
+            if done % log_every == 0 or done == total:
+                logger.info(description, done=done, total=total, seconds=round(time.perf_counter() - start, 1))
+    return results
@@ -0,0 +1,126 @@
+from typing import Callable, Dict, List, Optional
+import structlog
+from langchain.schema import Document
+
+from specialsitsai.bm25 import BM25Index
+from specialsitsai.tokens import estimate_tokens
+
+logger = structlog.get_logger(__name__)
+
+# Scores each candidate text against the query; higher is more relevant.
+Scorer = Callable[[str, List[str]], List[float]]
+
+
+def lexical_scorer(query: str, texts: List[str]) -> List[float]:
+    """BM25 scores of the candidates, with the candidate set as the corpus."""
+    return BM25Index([Document(page_content=text) for text in texts]).scores(query).tolist()
+
+
+def cross_encoder_scorer(model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2") -> Scorer:
+    """Scorer backed by a local ``sentence-transformers`` cross-encoder."""
+    try:
+        from sentence_transformers import CrossEncoder
+    except ImportError as e:
+        raise ImportError(
+            "The cross-encoder scorer requires sentence-transformers: `pip install sentence-transformers`."
+        ) from e
+    model = CrossEncoder(model_name)
+
+    def score(query: str, texts: List[str]) -> List[float]:
+        return [float(value) for value in model.predict([(query, text) for text in texts])] if texts else []
+    return score
+
+
+def _union(a_start: int, a_end: int, a_text: str, b_start: int, b_end: int, b_text: str) -> str:
+    """Text of two overlapping or touching slices of the same document, overlap included once."""
+    if b_start < a_start:
+        a_start, a_end, a_text, b_start, b_end, b_text = b_start, b_end, b_text, a_start, a_end, a_text
+    if b_end <= a_end:
+        return a_text
+    return a_text + b_text[a_end - b_start:]
+
+
+class ContextAssembler:
+    """Turn a query's retrieved chunks into a prompt context of at most ``token_budget`` tokens.
+
+    Candidates are reranked by fusing their retrieval rank with the ``scorer`` rank (reciprocal
+    rank fusion, lexical BM25 by default), then taken best first while they fit the budget.
+    Chunks overlapping an already taken chunk of the same filing are merged into one span so
+    the shared text is paid for once. The result is laid out in document order.
+    """
+
+    def __init__(self, token_budget: int = 2000, scorer: Optional[Scorer] = None, rrf_k: int = 60):
+        self.token_budget = token_budget
+        self.scorer = scorer or lexical_scorer
+        self.rrf_k = rrf_k
+
+    def rerank(self, query: str, documents: List[Document]) -> List[Document]:
+        if len(documents) < 2:
+            return list(documents)
+        scores = self.scorer(query, [document.page_content for document in documents])
+        scorer_rank = {
+            position: rank for rank, position in
+            enumerate(sorted(range(len(documents)), key=lambda i: -scores[i]), start=1)
+        }
+        fused = {
+            position: 1 / (self.rrf_k + position + 1) + 1 / (self.rrf_k + scorer_rank[position])
+            for position in range(len(documents))
+        }
+        return [documents[position] for position in sorted(fused, key=fused.get, reverse=True)]
+
+    @staticmethod
+    def _span(document: Document) -> Optional[Dict]:
+        """Offsets of a chunk that is still a verbatim slice of its filing (not contextualized)."""
+        start, end = document.metadata.get("start"), document.metadata.get("end")
+        if start is None or end is None or end - start != len(document.page_content):
+            return None
+        return {"source": document.metadata.get("source"), "start": start, "end": end}
+
+    def pack(self, documents: List[Document], token_budget: Optional[int] = None) -> List[str]:
+        """Take ranked chunks best first while they fit, merging overlaps; returns texts in document order."""
+        budget = token_budget or self.token_budget
+        selected: List[Dict] = []
+        seen_texts = set()
+        used = 0
+        for document in documents:
+            text = document.page_content
+            if text in seen_texts:
+                continue
+            span = self._span(document)
+            overlapping = next((
+                chosen for chosen in selected
+                if span and chosen["span"] and chosen["span"]["source"] == span["source"]
+                and span["start"] <= chosen["span"]["end"] and chosen["span"]["start"] <= span["end"]
+            ), None)
+            if overlapping is not None:
+                other = overlapping["span"]
+                merged = _union(other["start"], other["end"], overlapping["text"], span["start"], span["end"], text)
+                extra = estimate_tokens(merged) - estimate_tokens(overlapping["text"])
+                if used + extra <= budget:
+                    overlapping["text"] = merged
+                    other["start"], other["end"] = min(other["start"], span["start"]), max(other["end"], span["end"])
+                    used += extra
+                    seen_texts.add(text)
+                continue
+            cost = estimate_tokens(text)
+            if used + cost > budget:
+                continue
+            selected.append({"text": text, "span": span, "rank": len(selected)})
+            seen_texts.add(text)
+            used += cost
+        if not selected and documents:
+            # Even the best chunk is over budget: keep its head rather than send no context.
+            return [documents[0].page_content[:budget * 4]]
+        selected.sort(key=lambda chosen: (
+            (0, chosen["span"]["source"] or "", chosen["span"]["start"]) if chosen["span"] else (1, "", chosen["rank"])
+        ))
+        return [chosen["text"] for chosen in selected]
+
+    def assemble(self, query: str, documents: List[Document], token_budget: Optional[int] = None) -> str:
+        """Rerank, merge and pack ``documents`` into a context string for ``query``."""
+        texts = self.pack(self.rerank(query, documents), token_budget)
+        context = "\n\n".join(texts)
+        logger.debug(
+            "Assembled context", candidates=len(documents), chunks=len(texts), tokens=estimate_tokens(context)
+        )
+        return context
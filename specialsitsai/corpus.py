@@ -0,0 +1,135 @@
+import os
+import json
+import mmap
+import tempfile
+from typing import Dict, Iterable, Iterator, List, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+
+class CorpusStore:
+    """On-disk corpus of parsed filings: one UTF-8 text blob plus an offset table.
+
+    The blob is append-only and read through a shared read-only ``mmap``, so opening the corpus
+    only loads the offset table, ``raw`` hands out zero-copy views, and every process reading
+    the same store shares one copy of the pages through the OS page cache. Rewriting a source
+    appends the new text and repoints its offset; ``compact`` drops the superseded bytes.
+    """
+
+    TEXT_FILENAME = "texts.bin"
+    INDEX_FILENAME = "index.json"
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(self.directory, exist_ok=True)
+        self.text_path = os.path.join(directory, self.TEXT_FILENAME)
+        self.index_path = os.path.join(directory, self.INDEX_FILENAME)
+        self._offsets: Dict[str, List[int]] = {}
+        self._metadata: Dict[str, Dict] = {}
+        self._index_mtime: Optional[float] = None
+        self._mmap: Optional[mmap.mmap] = None
+        self.refresh()
+
+    def refresh(self):
+        """Reload the offset table if another process has written to the store."""
+        if not os.path.exists(self.index_path):
+            return
+        mtime = os.path.getmtime(self.index_path)
+        if mtime == self._index_mtime:
+            return
+        with open(self.index_path, 'r', encoding='utf-8') as file:
+            index = json.load(file)
+        self._offsets = index["offsets"]
+        self._metadata = index["metadata"]
+        self._index_mtime = mtime
+        self._close_map()
+
+    def _save_index(self):
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump({"offsets": self._offsets, "metadata": self._metadata}, file)
+        os.replace(tmp_path, self.index_path)
+        self._index_mtime = os.path.getmtime(self.index_path)
+
+    def _close_map(self):
+        if self._mmap is not None:
+            try:
+                self._mmap.close()
+            except BufferError:
+                # Views handed out by ``raw`` are still alive; the map is freed with the last one.
+                pass
+            self._mmap = None
+
+    def _map(self) -> mmap.mmap:
+        if self._mmap is None:
+            with open(self.text_path, 'rb') as file:
+                self._mmap = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._mmap
+
+    def write(self, documents: Iterable[Dict[str, str]]) -> int:
+        """Append ``{"source", "page_content", ...}`` documents; any other keys are kept as metadata."""
+        count = 0
+        with open(self.text_path, 'ab') as file:
+            for document in documents:
+                data = document["page_content"].encode("utf-8")
+                offset = file.tell()
+                file.write(data)
+                self._offsets[document["source"]] = [offset, len(data)]
+                self._metadata[document["source"]] = {
+                    key: value for key, value in document.items() if key not in ("source", "page_content")
+                }
+                count += 1
+        self._save_index()
+        # The blob grew, so the next read needs a fresh map.
+        self._close_map()
+        logger.info("Wrote documents to corpus", directory=self.directory, count=count)
+        return count
+
+    def __len__(self) -> int:
+        return len(self._offsets)
+
+    def __contains__(self, source: str) -> bool:
+        return source in self._offsets
+
+    def sources(self, **filters) -> List[str]:
+        """Sources whose metadata matches every ``key=value`` filter."""
+        return [
+            source for source, metadata in self._metadata.items()
+            if all(metadata.get(key) == value for key, value in filters.items())
+        ]
+
+    def metadata(self, source: str) -> Dict:
+        return self._metadata.get(source, {})
+
+    def raw(self, source: str) -> memoryview:
+        """Zero-copy view of a source's UTF-8 bytes."""
+        offset, length = self._offsets[source]
+        if not length:
+            return memoryview(b"")
+        return memoryview(self._map())[offset:offset + length]
+
+    def get_text(self, source: str) -> str:
+        offset, length = self._offsets[source]
+        if not length:
+            return ""
+        return self._map()[offset:offset + length].decode("utf-8")
+
+    def iter_documents(self, sources: Optional[Iterable[str]] = None) -> Iterator[Dict[str, str]]:
+        """Yield ``{"source", "page_content", ...metadata}`` dicts, decoding one document at a time."""
+        for source in (self._offsets if sources is None else sources):
+            yield {**self.metadata(source), "source": source, "page_content": self.get_text(source)}
+
+    def compact(self):
+        """Rewrite the blob without the bytes of superseded documents."""
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        offsets = {}
+        with os.fdopen(fd, 'wb') as file:
+            for source in self._offsets:
+                with self.raw(source) as view:
+                    offsets[source] = [file.tell(), len(view)]
+                    file.write(view)
+        self._close_map()
+        os.replace(tmp_path, self.text_path)
+        self._offsets = offsets
+        self._save_index()
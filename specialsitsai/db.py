@@ -1,20 +1,53 @@
 import os
-from typing import List, Dict, Union, Optional
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Union
 import requests
-from bs4 import BeautifulSoup, XMLParsedAsHTMLWarning
+from bs4 import XMLParsedAsHTMLWarning
 import re
 import warnings
 import structlog
 
+from specialsitsai.cache import DiskCache
+from specialsitsai.corpus import CorpusStore
+from specialsitsai.manifest import FilingManifest, file_sha256, filename_ticker, sniff_form_type
+from specialsitsai.parsers import get_backend, iter_text_stream, normalize_whitespace
+
 warnings.filterwarnings("ignore", category=XMLParsedAsHTMLWarning)
 logger = structlog.get_logger(__name__) 
 
+# Bump whenever parse_html output changes so cached texts are not reused.
+PARSER_VERSION = "2"
+
+
+def _parse_html_safe(filepath: str, backend: str = "bs4") -> str:
+    """Parse a single file inside a worker, isolating any failure to that file."""
+    try:
+        return HTMLHandler.parse_html(filepath, backend=backend)
+    except Exception as e:
+        logger.error("Failed to parse HTML file", filepath=filepath, error=str(e))
+        return ""
+
+
 class HTMLHandler:
-    def __init__(self, save_directory: Optional[str] = None):
+    def __init__(self,
+                 save_directory: Optional[str] = None,
+                 cache: Optional[DiskCache] = None,
+                 backend: str = "bs4",
+                 manifest: Optional[FilingManifest] = None):
+        self.cache = cache
+        # Fail on an unknown or uninstalled backend now rather than parse every file to "".
+        get_backend(backend)
+        self.backend = backend
+        self.manifest = manifest
         if save_directory:
             self.save_directory = save_directory
             if not os.path.exists(self.save_directory):
                 os.makedirs(self.save_directory)  
+        if self.manifest is not None:
+            # Lookups trust the manifest, so bring it up to date with the folder first;
+            # unchanged files only cost a stat.
+            self.manifest.refresh()
 
     @property
     def html_files(self) -> List[str]:
@@ -26,18 +59,58 @@ class HTMLHandler:
         return html_files
     
     @staticmethod
-    def parse_html(filepath: str) -> str:
-        """Parse HTML file to extract text content."""
+    def parse_html(filepath: str, backend: str = "bs4") -> str:
+        """Parse HTML file to extract text content with the given backend (see ``parsers.BACKENDS``)."""
         try:
-            with open(filepath, 'r', encoding='utf-8') as file:
-                soup = BeautifulSoup(file, 'html.parser')
-                text = soup.get_text(separator="\n")
-                cleaned_text = re.sub(r'\s+', ' ', text)  # Normalize white spaces
-                return cleaned_text.strip()
+            return normalize_whitespace(get_backend(backend).extract_file(filepath))
         except IOError as e:
             print(f"Error reading HTML file {filepath}: {e}")
             return ""
 
+    @staticmethod
+    def stream_html(filepath: str, block_size: int = 1 << 16) -> Iterator[str]:
+        """Incrementally yield the normalized text of a (possibly huge) HTML file."""
+        return iter_text_stream(filepath, block_size=block_size)
+
+    @staticmethod
+    def extract_to_file(filepath: str, output_path: str, block_size: int = 1 << 16) -> int:
+        """Stream the normalized text of ``filepath`` into ``output_path``; returns characters written."""
+        written = 0
+        with open(output_path, 'w', encoding='utf-8') as output:
+            for text in iter_text_stream(filepath, block_size=block_size):
+                written += output.write(text)
+        return written
+
+    def cache_key(self, filepath: str) -> Optional[str]:
+        """Key a file by its content hash, backend and parser version, or None if unreadable.
+
+        The hash is the manifest's when it is still current for the file, else computed block by
+        block, so keying a huge filing never loads it whole.
+        """
+        try:
+            entry = self.manifest.get(os.path.basename(filepath)) if self.manifest is not None else None
+            stat = os.stat(filepath)
+            if entry and entry.get("sha256") and (entry["size"], entry["mtime"]) == (stat.st_size, stat.st_mtime):
+                content_hash = entry["sha256"]
+            else:
+                content_hash = file_sha256(filepath)
+        except OSError:
+            return None
+        backend = get_backend(self.backend)
+        return DiskCache.make_key(PARSER_VERSION, backend.name, backend.version, content_hash)
+
+    def parse_file(self, filepath: str) -> str:
+        """Parse a single file, going through the parse cache when one is configured."""
+        key = self.cache_key(filepath) if self.cache else None
+        if key:
+            text = self.cache.get(key)
+            if text is not None:
+                return text
+        text = _parse_html_safe(filepath, self.backend)
+        if key and text:
+            self.cache.put(key, text)
+        return text
+
     @staticmethod
     def structure_text(text: str) -> Dict[str, str]:
         """Convert extracted text to a structured format."""
@@ -48,19 +121,167 @@ class HTMLHandler:
 
     @staticmethod
     def chunk_text(text: str, max_tokens: int = 512) -> List[str]:
-        """Chunk text into smaller pieces for LLM processing."""
-        words = text.split()
-        chunks = [' '.join(words[i:i + max_tokens]) for i in range(0, len(words), max_tokens)]
+        """Chunk text into pieces of ``max_tokens`` words, sliced by offset instead of re-joining a word list."""
+        chunks = []
+        count = 0
+        chunk_start = chunk_end = 0
+        for match in re.finditer(r'\S+', text):
+            if count == 0:
+                chunk_start = match.start()
+            chunk_end = match.end()
+            count += 1
+            if count == max_tokens:
+                chunks.append(text[chunk_start:chunk_end])
+                count = 0
+        if count:
+            chunks.append(text[chunk_start:chunk_end])
         return chunks
 
-    def process_html_files(self) -> List[Dict[str, Union[str, List[str]]]]:
-        """Process all HTML files in the save directory and prepare them for LLM input."""
-        processed_files = []
-        for filename in os.listdir(self.save_directory):
-            if filename.endswith('.htm') or filename.endswith('.html'):
-                text = self.parse_html(os.path.join(self.save_directory, filename))
-                processed_files.append({
+    @staticmethod
+    def chunk_stream(pieces: Iterable[str], max_tokens: int = 512) -> Iterator[str]:
+        """Streaming ``chunk_text``: chunk text arriving in pieces without joining it first."""
+        words: List[str] = []
+        partial = ""
+        for piece in pieces:
+            if not piece:
+                continue
+            if partial and piece[0].isspace():
+                words.append(partial)
+                partial = ""
+            piece_words = piece.split()
+            if partial and piece_words:
+                piece_words[0] = partial + piece_words[0]
+                partial = ""
+            if piece_words and not piece[-1].isspace():
+                partial = piece_words.pop()
+            words.extend(piece_words)
+            while len(words) >= max_tokens:
+                yield ' '.join(words[:max_tokens])
+                del words[:max_tokens]
+        if partial:
+            words.append(partial)
+        for i in range(0, len(words), max_tokens):
+            yield ' '.join(words[i:i + max_tokens])
+
+    def iter_html_files(self,
+                        predicate: Optional[Callable[[str], bool]] = None,
+                        ticker: Optional[str] = None) -> Iterator[Dict[str, str]]:
+        """Lazily parse and yield the HTML files whose filename passes the filters.
+
+        ``ticker`` keeps the files of that ticker (see ``ticker_of``) and ``predicate`` is called with each filename; both are
+        applied before any file is opened, and only one parsed document is held at a time.
+        """
+        try:
+            for filename in self._candidate_files(ticker):
+                if predicate is not None and not predicate(filename):
+                    continue
+                text = self.parse_file(os.path.join(self.save_directory, filename))
+                if self.manifest is not None:
+                    self.manifest.mark_parsed(filename, success=bool(text))
+                yield {
+                    "source": filename,
+                    "page_content": text,
+                    **self.filing_metadata(filename),
+                }
+        finally:
+            if self.manifest is not None:
+                self.manifest.save()
+
+    def filing_metadata(self, filename: str) -> Dict[str, str]:
+        """Ticker, filing number, form type and date of a file; ticker and form type without a manifest."""
+        if self.manifest is not None and self.manifest.get(filename):
+            return self.manifest.filing_metadata(filename)
+        metadata = {"ticker": self.ticker_of(filename)}
+        form_type = sniff_form_type(os.path.join(self.save_directory, filename))
+        if form_type:
+            metadata["form_type"] = form_type
+        return {key: value for key, value in metadata.items() if value}
+
+    def ticker_of(self, filename: str) -> Optional[str]:
+        """A file's ticker: the manifest's when it knows the file, else ``filename_ticker``."""
+        if self.manifest is not None and self.manifest.get(filename):
+            return self.manifest.get(filename).get("ticker")
+        return filename_ticker(filename)
+
+    def _candidate_files(self, ticker: Optional[str] = None) -> Iterator[str]:
+        """Filenames to consider, straight from the manifest when one can answer the query."""
+        if self.manifest is not None and ticker is not None:
+            yield from self.manifest.files_for_ticker(ticker)
+            return
+        with os.scandir(self.save_directory) as entries:
+            for entry in entries:
+                filename = entry.name
+                if not (filename.endswith('.htm') or filename.endswith('.html')):
+                    continue
+                if ticker is not None and filename_ticker(filename) != ticker:
+                    continue
+                yield filename
+
+    def write_corpus(self,
+                     store: CorpusStore,
+                     predicate: Optional[Callable[[str], bool]] = None,
+                     ticker: Optional[str] = None) -> int:
+        """Parse new or changed files into ``store``; files already stored unchanged are not parsed.
+
+        Files that fail to parse are not written, so the next call tries them again.
+        """
+        def documents() -> Iterator[Dict[str, str]]:
+            for filename in self._candidate_files(ticker):
+                if predicate is not None and not predicate(filename):
+                    continue
+                filepath = os.path.join(self.save_directory, filename)
+                key = self.cache_key(filepath)
+                if key and filename in store and store.metadata(filename).get("key") == key:
+                    continue
+                text = self.parse_file(filepath)
+                if not text:
+                    logger.warning("Not writing unparsed file to corpus", filename=filename)
+                    continue
+                yield {
                     "source": filename,
                     "page_content": text,
-                })
-        return processed_files
+                    "key": key,
+                    **self.filing_metadata(filename),
+                }
+        return store.write(documents())
+
+    def process_html_files(self,
+                           parallel: bool = False,
+                           max_workers: Optional[int] = None,
+                           chunksize: int = 8) -> List[Dict[str, Union[str, List[str]]]]:
+        """Process all HTML files in the save directory and prepare them for LLM input.
+
+        With ``parallel=True`` the files are parsed in a process pool of ``max_workers``
+        processes (defaults to the CPU count), dispatched in batches of ``chunksize`` files.
+        """
+        filenames = [
+            filename for filename in os.listdir(self.save_directory)
+            if filename.endswith('.htm') or filename.endswith('.html')
+        ]
+        filepaths = [os.path.join(self.save_directory, filename) for filename in filenames]
+        texts: List[Optional[str]] = [None] * len(filepaths)
+        keys: List[Optional[str]] = [None] * len(filepaths)
+        if self.cache:
+            for i, filepath in enumerate(filepaths):
+                keys[i] = self.cache_key(filepath)
+                texts[i] = self.cache.get(keys[i]) if keys[i] else None
+        pending = [i for i, text in enumerate(texts) if text is None]
+        pending_paths = [filepaths[i] for i in pending]
+        parse = partial(_parse_html_safe, backend=self.backend)
+        if parallel and pending_paths:
+            with ProcessPoolExecutor(max_workers=max_workers) as executor:
+                parsed = list(executor.map(parse, pending_paths, chunksize=chunksize))
+        else:
+            parsed = [parse(filepath) for filepath in pending_paths]
+        for i, text in zip(pending, parsed):
+            texts[i] = text
+            if self.cache and keys[i] and text:
+                self.cache.put(keys[i], text)
+        if self.manifest is not None:
+            for filename, text in zip(filenames, texts):
+                self.manifest.mark_parsed(filename, success=bool(text))
+            self.manifest.save()
+        return [
+            {"source": filename, "page_content": text, **self.filing_metadata(filename)}
+            for filename, text in zip(filenames, texts)
+        ]
@@ -0,0 +1,152 @@
+import re
+import zlib
+import hashlib
+from typing import Dict, FrozenSet, List, Optional, Set
+import numpy as np
+import structlog
+from langchain.schema import Document
+
+logger = structlog.get_logger(__name__)
+
+# Smallest prime above 2**32; with 32-bit hashes and coefficients the products fit in uint64.
+_PRIME = np.uint64(4294967311)
+_MAX_HASH = 2 ** 32 - 1
+
+# Numbers, amounts and month names: the facts that tell an amended chunk from its original.
+FACT_PATTERN = re.compile(
+    r'\d+(?:[.,]\d+)*%?|\b(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\b', re.IGNORECASE
+)
+
+
+def scope_of(document: Document, scope_key: str):
+    """A chunk's value of ``scope_key``, falling back to its source."""
+    scope = document.metadata.get(scope_key)
+    return scope if scope is not None else document.metadata.get("source", "")
+
+
+def facts_of(text: str) -> FrozenSet[str]:
+    return frozenset(fact.lower().replace(',', '') for fact in FACT_PATTERN.findall(text))
+
+
+def is_newer(document: Document, other: Document) -> bool:
+    """Whether ``document`` comes from a later filing than ``other`` (ISO ``date_filing`` strings)."""
+    return (document.metadata.get("date_filing") or "") > (other.metadata.get("date_filing") or "")
+
+
+class ChunkDeduplicator:
+    """Collapse exact and near-duplicate chunks so each is embedded once.
+
+    Exact duplicates are found by hashing the whitespace/case-normalized text; near duplicates by
+    MinHash signatures over word shingles, bucketed with LSH (``bands`` bands of
+    ``num_perm // bands`` rows) and confirmed when the estimated Jaccard similarity reaches
+    ``threshold``. Near duplicates whose numbers or dates differ are kept apart, since those are
+    what an amendment changes. Of each group the chunk of the newest ``date_filing`` is kept, and
+    it records every source it stands for in its ``sources`` metadata.
+    With a ``scope_key`` only chunks sharing that metadata value (e.g. the same ticker) are
+    collapsed, so metadata-filtered retrieval still finds every scope's copy; chunks without that
+    metadata are scoped to their source.
+    """
+
+    def __init__(self,
+                 threshold: float = 0.85,
+                 num_perm: int = 128,
+                 bands: int = 32,
+                 shingle_size: int = 5,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be a multiple of bands")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.shingle_size = shingle_size
+        rng = np.random.default_rng(seed)
+        self._a = rng.integers(1, _MAX_HASH, num_perm, dtype=np.uint64)
+        self._b = rng.integers(0, _MAX_HASH, num_perm, dtype=np.uint64)
+        self.stats: Dict[str, int] = {}
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of the text's word shingles."""
+        words = text.lower().split()
+        k = self.shingle_size
+        shingles = {" ".join(words[i:i + k]) for i in range(max(1, len(words) - k + 1))}
+        hashes = np.fromiter(
+            (zlib.crc32(shingle.encode("utf-8")) for shingle in shingles), dtype=np.uint64, count=len(shingles)
+        )
+        return ((np.outer(hashes, self._a) + self._b) % _PRIME).min(axis=0)
+
+    @staticmethod
+    def _exact_key(text: str) -> str:
+        return hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+
+    def deduplicate(self, documents: List[Document], scope_key: Optional[str] = None) -> List[Document]:
+        """Return one document per duplicate group, in the order the groups were first seen."""
+        kept: List[Document] = []
+        facts: List[FrozenSet[str]] = []
+        signatures: List[np.ndarray] = []
+        sources: List[List[str]] = []
+        exact_index: Dict[str, int] = {}
+        buckets: Dict[bytes, List[int]] = {}
+        exact_duplicates = near_duplicates = 0
+
+        for document in documents:
+            source = document.metadata.get("source", "")
+            scope = str(scope_of(document, scope_key)) if scope_key else ""
+            exact_key = f"{scope}\0{self._exact_key(document.page_content)}"
+            if exact_key in exact_index:
+                self._merge(kept, sources, exact_index[exact_key], document)
+                exact_duplicates += 1
+                continue
+
+            signature = self.signature(document.page_content)
+            band_keys = [
+                scope.encode("utf-8") + bytes([0, band]) + signature[band * self.rows:(band + 1) * self.rows].tobytes()
+                for band in range(self.bands)
+            ]
+            candidates: Set[int] = set()
+            for band_key in band_keys:
+                candidates.update(buckets.get(band_key, ()))
+            document_facts = facts_of(document.page_content)
+            match = next((
+                i for i in sorted(candidates)
+                if np.mean(signatures[i] == signature) >= self.threshold and facts[i] == document_facts
+            ), None)
+            if match is not None:
+                self._merge(kept, sources, match, document)
+                exact_index[exact_key] = match
+                near_duplicates += 1
+                continue
+
+            index = len(kept)
+            kept.append(document)
+            facts.append(document_facts)
+            signatures.append(signature)
+            sources.append([source])
+            exact_index[exact_key] = index
+            for band_key in band_keys:
+                buckets.setdefault(band_key, []).append(index)
+
+        deduplicated = [
+            Document(
+                page_content=document.page_content,
+                metadata={**document.metadata, "sources": "|".join(doc_sources), "num_sources": len(doc_sources)},
+            ) if len(doc_sources) > 1 else document
+            for document, doc_sources in zip(kept, sources)
+        ]
+        self.stats = {
+            "input": len(documents),
+            "exact_duplicates": exact_duplicates,
+            "near_duplicates": near_duplicates,
+            "output": len(deduplicated),
+        }
+        logger.info("Deduplicated chunks", **self.stats)
+        return deduplicated
+
+    @staticmethod
+    def _merge(kept: List[Document], sources: List[List[str]], index: int, document: Document):
+        """Add ``document`` to group ``index``, making it the group's chunk if its filing is newer."""
+        source = document.metadata.get("source", "")
+        if source not in sources[index]:
+            sources[index].append(source)
+        if is_newer(document, kept[index]):
+            kept[index] = document
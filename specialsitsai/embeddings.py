@@ -0,0 +1,118 @@
+import time
+import hashlib
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, Iterable, List
+import structlog
+from langchain_core.embeddings import Embeddings
+
+from specialsitsai.cache import HitCounter, SQLiteLRUCache
+from specialsitsai.index import embedding_model_id
+
+logger = structlog.get_logger(__name__)
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+class EmbeddingCache(SQLiteLRUCache):
+    """SQLite store of embedding vectors keyed by (model id, text hash), evicted least recently used.
+
+    One cache file can be shared by every index, run and process that embeds text; vectors are
+    stored as float32 blobs and ``max_entries`` bounds its size.
+    """
+
+    table = "embeddings"
+    schema = (
+        "model TEXT NOT NULL, text_hash TEXT NOT NULL, vector BLOB NOT NULL, last_access REAL NOT NULL, "
+        "PRIMARY KEY (model, text_hash)"
+    )
+
+    def __init__(self, path: str, max_entries: int = 2_000_000):
+        super().__init__(path, max_entries)
+
+    def get_many(self, model: str, hashes: Iterable[str]) -> Dict[str, List[float]]:
+        """Vectors found for ``hashes``; found entries become the most recently used."""
+        hashes = list(hashes)
+        found = {}
+        with self._lock:
+            for i in range(0, len(hashes), 500):
+                batch = hashes[i:i + 500]
+                rows = self._conn.execute(
+                    f"SELECT text_hash, vector FROM embeddings WHERE model = ? "
+                    f"AND text_hash IN ({','.join('?' * len(batch))})",
+                    [model, *batch],
+                ).fetchall()
+                for hash_, blob in rows:
+                    found[hash_] = array('f', blob).tolist()
+            if found:
+                now = time.time()
+                self._conn.executemany(
+                    "UPDATE embeddings SET last_access = ? WHERE model = ? AND text_hash = ?",
+                    [(now, model, hash_) for hash_ in found],
+                )
+                self._conn.commit()
+        return found
+
+    def put_many(self, model: str, vectors: Dict[str, List[float]]):
+        now = time.time()
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO embeddings (model, text_hash, vector, last_access) VALUES (?, ?, ?, ?)",
+                [(model, hash_, array('f', vector).tobytes(), now) for hash_, vector in vectors.items()],
+            )
+            self._evict()
+            self._conn.commit()
+
+
+class CachedEmbeddings(Embeddings, HitCounter):
+    """Embeddings provider wrapper that serves repeated texts from an ``EmbeddingCache``.
+
+    Cache misses are de-duplicated and sent to the wrapped provider in batches of ``batch_size``,
+    at most ``max_concurrency`` batches at a time.
+    """
+
+    def __init__(self,
+                 underlying: Embeddings,
+                 cache: EmbeddingCache,
+                 batch_size: int = 256,
+                 max_concurrency: int = 4):
+        super().__init__()
+        self.underlying = underlying
+        self.cache = cache
+        self.model_id = embedding_model_id(underlying)
+        self.batch_size = batch_size
+        self.max_concurrency = max_concurrency
+
+    def _embed(self, texts: List[str], namespace: str, embed_batch) -> List[List[float]]:
+        hashes = [text_hash(f"{namespace}\0{text}") for text in texts]
+        vectors = self.cache.get_many(self.model_id, set(hashes))
+        hits = sum(1 for hash_ in hashes if hash_ in vectors)
+        self.record(hits=hits, misses=len(hashes) - hits)
+        pending = {}
+        for hash_, text in zip(hashes, texts):
+            if hash_ not in vectors:
+                pending.setdefault(hash_, text)
+        if pending:
+            pending_hashes = list(pending)
+            batches = [
+                pending_hashes[i:i + self.batch_size] for i in range(0, len(pending_hashes), self.batch_size)
+            ]
+            with ThreadPoolExecutor(max_workers=self.max_concurrency) as executor:
+                results = executor.map(lambda batch: embed_batch([pending[hash_] for hash_ in batch]), batches)
+                for batch, batch_vectors in zip(batches, results):
+                    computed = dict(zip(batch, batch_vectors))
+                    self.cache.put_many(self.model_id, computed)
+                    vectors.update(computed)
+        return [vectors[hash_] for hash_ in hashes]
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        return self._embed(texts, "document", self.underlying.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        return self.embed_queries([text])[0]
+
+    def embed_queries(self, texts: List[str]) -> List[List[float]]:
+        # Some providers embed queries differently from documents, so they are cached apart.
+        return self._embed(texts, "query", lambda batch: [self.underlying.embed_query(text) for text in batch])
@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+from typing import Any, Dict, Tuple, Type
+from pydantic import BaseModel, Field, create_model
+from langchain.output_parsers import DatetimeOutputParser
+from langchain_core.output_parsers import PydanticOutputParser
+
+
+def answer_field(question: dict) -> Tuple[type, Any]:
+    """Composite schema field answering one question, typed after the question's parser."""
+    parser = question["parser"]
+    if isinstance(parser, PydanticOutputParser):
+        return (parser.pydantic_object, Field(description=question["query"]))
+    if isinstance(parser, DatetimeOutputParser):
+        return (datetime, Field(description=f"{question['query']} Give an ISO 8601 date and time."))
+    return (str, Field(description=question["query"]))
+
+
+def composite_schema(questions: Dict[str, dict], name: str = "QuestionSetAnswers") -> Type[BaseModel]:
+    """One pydantic model with a field per question key, so a question set can be answered in one call."""
+    return create_model(name, **{key: answer_field(question) for key, question in questions.items()})
+
+
+def fused_query(questions: Dict[str, dict]) -> str:
+    lines = [f"- {key}: {question['query']}" for key, question in questions.items()]
+    return "Answer each of the following questions in the matching field:\n" + "\n".join(lines)
+
+
+def split_answers(answers: BaseModel, questions: Dict[str, dict]) -> Dict[str, Any]:
+    """Per-key responses in the same shape as answering each question separately."""
+    responses = {}
+    for key in questions:
+        value = getattr(answers, key)
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            # DatetimeOutputParser reads the trailing "Z" as a literal and returns naive UTC datetimes.
+            value = value.astimezone(timezone.utc).replace(tzinfo=None)
+        responses[key] = value
+    return responses
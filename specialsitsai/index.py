@@ -0,0 +1,183 @@
+import re
+import uuid
+import hashlib
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import structlog
+import chromadb
+from langchain_chroma import Chroma
+from langchain.schema import Document
+from langchain_core.embeddings import Embeddings
+
+from specialsitsai.dedup import scope_of
+
+logger = structlog.get_logger(__name__)
+
+
+def chunk_id(text: str, model_id: str, variant: str = "") -> str:
+    """Stable id of a chunk: hash of the embedding model, an indexing variant and the chunk text."""
+    return hashlib.sha256(f"{model_id}\0{variant}\0{text}".encode("utf-8")).hexdigest()
+
+
+def content_version(ids: Iterable[str]) -> str:
+    """Hash of a set of chunk ids; changes whenever a chunk is added or removed."""
+    digest = hashlib.sha256()
+    for id_ in sorted(ids):
+        digest.update(id_.encode("utf-8"))
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def document_id(document: Document, model_id: str, variant: str = "", scope_key: Optional[str] = None) -> str:
+    """``chunk_id`` of a document; with a ``scope_key`` equal texts of different scopes get distinct ids."""
+    if scope_key:
+        variant = f"{variant}\0{scope_key}={scope_of(document, scope_key)}"
+    return chunk_id(document.page_content, model_id, variant)
+
+
+def where_clause(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Chroma ``where`` filter matching every ``key=value`` pair; list values match any of their items."""
+    if not filters:
+        return None
+    conditions = [
+        {key: {"$in": list(value)} if isinstance(value, (list, tuple, set)) else value}
+        for key, value in filters.items()
+    ]
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
+
+
+def metadata_matches(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Whether metadata passes ``filters``, with the same semantics as ``where_clause``."""
+    for key, value in (filters or {}).items():
+        if isinstance(value, (list, tuple, set)):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
+def embedding_model_id(embedding: Embeddings) -> str:
+    """Identify an embedding model by provider class and model name, e.g. ``OpenAIEmbeddings:text-embedding-ada-002``."""
+    # Wrappers such as CachedEmbeddings carry the id of the model they wrap.
+    if getattr(embedding, "model_id", None):
+        return embedding.model_id
+    return f"{type(embedding).__name__}:{getattr(embedding, 'model', '')}"
+
+
+def collection_name_for(prefix: str, model_id: str) -> str:
+    """A valid Chroma collection name (3-63 chars of [A-Za-z0-9._-]) for a model's vectors."""
+    name = re.sub(r'[^A-Za-z0-9._-]+', '-', f"{prefix}-{model_id}").strip('-._')
+    if len(name) > 63:
+        name = f"{name[:46]}-{hashlib.sha1(name.encode()).hexdigest()[:16]}"
+    return name
+
+
+class ChromaIndex:
+    """Chroma collection whose chunks are keyed by content hash and embedding model id.
+
+    With a ``persist_directory`` the collection survives between runs: opening it costs no
+    embedding calls and ``add`` only embeds chunks whose id is not stored yet. Each embedding
+    model gets its own collection, since vectors of different models cannot be mixed. Chunks keep
+    their filing metadata, so one collection can hold every ticker and be queried per ticker,
+    filing or form type through ``where_clause`` filters.
+
+    Without a ``persist_directory`` Chroma keeps collections in one process-wide client, so each
+    in-memory index gets a collection of its own instead of sharing chunks with other instances,
+    and ``close`` must be called to free it.
+    """
+
+    # Stay below Chroma's per-call upsert limit.
+    batch_size = 4000
+    # Chroma's shared client registry is not safe to initialize from several threads at once.
+    _client_lock = threading.Lock()
+
+    def __init__(self,
+                 embedding: Embeddings,
+                 model_id: str,
+                 persist_directory: str = None,
+                 collection_prefix: str = "specialsitsai"):
+        self.model_id = model_id
+        self.embedding = embedding
+        self.persistent = persist_directory is not None
+        if persist_directory is None:
+            collection_prefix = f"{collection_prefix}-{uuid.uuid4().hex[:12]}"
+        collection_name = collection_name_for(collection_prefix, model_id)
+        with self._client_lock:
+            # Own the client so vectors embedded ahead of time can go through a public collection handle.
+            client = chromadb.PersistentClient(path=persist_directory) if persist_directory else chromadb.EphemeralClient()
+            self.collection = client.get_or_create_collection(collection_name)
+            self.store = Chroma(client=client, collection_name=collection_name, embedding_function=embedding)
+
+    def ids(self) -> Set[str]:
+        return set(self.store.get(include=[])["ids"])
+
+    def documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Stored chunks matching ``filters``, without their vectors."""
+        stored = self.store.get(where=where_clause(filters), include=["documents", "metadatas"])
+        return [
+            Document(page_content=text, metadata=metadata or {})
+            for text, metadata in zip(stored["documents"], stored["metadatas"])
+        ]
+
+    def ids_for_source(self, source: str) -> Set[str]:
+        return set(self.store.get(where={"source": source}, include=[])["ids"])
+
+    def version(self) -> str:
+        return content_version(self.ids())
+
+    def missing(self,
+                documents: Iterable[Document],
+                variant: str = "",
+                scope_key: Optional[str] = None) -> List[Tuple[str, Document]]:
+        """(id, document) pairs for the documents not in the index yet, each id once."""
+        existing = self.ids()
+        missing = {}
+        for document in documents:
+            id_ = document_id(document, self.model_id, variant, scope_key)
+            if id_ not in existing and id_ not in missing:
+                missing[id_] = document
+        return list(missing.items())
+
+    def add(self, ids: List[str], documents: List[Document], embeddings: Optional[List[List[float]]] = None):
+        """Upsert documents under the given ids, embedding them unless ``embeddings`` are passed."""
+        if not ids:
+            return
+        if embeddings is None:
+            self.store.add_documents(documents, ids=ids)
+        else:
+            for i in range(0, len(ids), self.batch_size):
+                batch = slice(i, i + self.batch_size)
+                self.collection.upsert(
+                    ids=ids[batch],
+                    embeddings=embeddings[batch],
+                    metadatas=[document.metadata for document in documents[batch]],
+                    documents=[document.page_content for document in documents[batch]],
+                )
+        logger.info("Added chunks to index", count=len(ids), model_id=self.model_id)
+
+    def delete(self, ids: Iterable[str]):
+        ids = list(ids)
+        if ids:
+            self.store.delete(ids=ids)
+            logger.info("Deleted chunks from index", count=len(ids), model_id=self.model_id)
+
+    def delete_stale(self, sources: Iterable[str], keep_ids: Set[str]):
+        """Delete chunks of ``sources`` that are no longer produced by the current documents."""
+        stale = set()
+        for source in sources:
+            stale |= self.ids_for_source(source) - keep_ids
+        self.delete(stale)
+
+    def retriever(self, k: int = 4, filters: Optional[Dict[str, Any]] = None):
+        """Similarity retriever returning ``k`` chunks matching ``filters``."""
+        where = where_clause(filters)
+        return self.store.as_retriever(search_kwargs={"k": k, "filter": where} if where else {"k": k})
+
+    def as_retriever(self, **kwargs):
+        return self.store.as_retriever(**kwargs)
+
+    def close(self):
+        """Drop an in-memory collection from Chroma's process-wide client; persisted ones are kept."""
+        if not self.persistent:
+            self.store.delete_collection()
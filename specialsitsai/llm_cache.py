@@ -0,0 +1,89 @@
+import json
+import time
+import hashlib
+import threading
+from typing import Any, Dict, Optional
+import structlog
+from langchain_core.output_parsers import PydanticOutputParser
+
+from specialsitsai.cache import HitCounter, SQLiteLRUCache
+
+logger = structlog.get_logger(__name__)
+
+_format_instructions: Dict[str, str] = {}
+_format_instructions_lock = threading.Lock()
+
+
+def parser_identity(parser: Any) -> str:
+    """Stable description of what a parser expects: its class plus its datetime format or schema."""
+    identity = type(parser).__name__
+    if isinstance(parser, PydanticOutputParser):
+        schema = parser.pydantic_object.model_json_schema()
+        return f"{identity}:{json.dumps(schema, sort_keys=True)}"
+    if getattr(parser, "format", None):
+        return f"{identity}:{parser.format}"
+    return identity
+
+
+def format_instructions(parser: Any) -> str:
+    """A parser's format instructions, computed once per ``parser_identity`` and reused.
+
+    Some parsers (``DatetimeOutputParser``) put random examples in their instructions, which
+    would make every rendered prompt, and so every cache key, unique.
+    """
+    identity = parser_identity(parser)
+    with _format_instructions_lock:
+        if identity not in _format_instructions:
+            try:
+                _format_instructions[identity] = parser.get_format_instructions()
+            except NotImplementedError:
+                # e.g. StrOutputParser, which takes the answer as it comes.
+                _format_instructions[identity] = ""
+        return _format_instructions[identity]
+
+
+class LLMCache(SQLiteLRUCache, HitCounter):
+    """SQLite exact-match cache of LLM responses.
+
+    Keys hash the model id, the fully rendered prompt and the parser's ``parser_identity``, so a
+    response is only reused for exactly the same request. Prompts must be rendered with
+    ``format_instructions`` for the key to repeat. Entries older than ``ttl`` seconds are
+    ignored and the least recently used ones are evicted beyond ``max_entries``.
+    """
+
+    table = "responses"
+    schema = "key TEXT PRIMARY KEY, response TEXT NOT NULL, created REAL NOT NULL, last_access REAL NOT NULL"
+
+    def __init__(self, path: str, ttl: Optional[float] = None, max_entries: int = 100_000):
+        super().__init__(path, max_entries)
+        self.ttl = ttl
+
+    @staticmethod
+    def make_key(model_id: str, prompt: str, parser_id: str = "") -> str:
+        return hashlib.sha256(f"{model_id}\0{parser_id}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute("SELECT response, created FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None and self.ttl is not None and now - row[1] > self.ttl:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                row = None
+            if row is None:
+                self.record(misses=1)
+                return None
+            self._conn.execute("UPDATE responses SET last_access = ? WHERE key = ?", (now, key))
+            self._conn.commit()
+            self.record(hits=1)
+            return row[0]
+
+    def put(self, key: str, response: str):
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, response, created, last_access) VALUES (?, ?, ?, ?)",
+                (key, response, now, now),
+            )
+            self._evict()
+            self._conn.commit()
@@ -0,0 +1,231 @@
+import os
+import re
+import json
+import hashlib
+import tempfile
+from typing import Dict, Iterable, List, Optional
+import structlog
+
+logger = structlog.get_logger(__name__)
+
+MANIFEST_FILENAME = "manifest.json"
+MAPPER_FILENAME = "join_html_mapper.json"
+
+# Filing metadata carried from the manifest onto parsed documents and index chunks.
+FILING_FIELDS = ("ticker", "num_filing", "form_type", "date_filing")
+
+# Most specific first: cover pages of tender offers routinely mention the issuer's 10-K.
+FORM_TYPE_PATTERNS = [
+    ("SC TO-I", re.compile(r'(?<![A-Za-z0-9])SC[\s_-]*TO[\s_-]*I(?![A-Za-z0-9])', re.IGNORECASE)),
+    ("SC TO-T", re.compile(r'(?<![A-Za-z0-9])SC[\s_-]*TO[\s_-]*T(?![A-Za-z0-9])', re.IGNORECASE)),
+    ("SC TO", re.compile(r'(?<![A-Za-z0-9])SCHEDULE\s+TO(?![A-Za-z0-9])', re.IGNORECASE)),
+    ("10-12B", re.compile(r'(?<![A-Za-z0-9])(?:10[\s_-]*12B|FORM\s+10)(?![A-Za-z0-9-])', re.IGNORECASE)),
+    ("10-K", re.compile(r'(?<![A-Za-z0-9])10[\s_-]*K(?![A-Za-z0-9])', re.IGNORECASE)),
+    ("8-K", re.compile(r'(?<![A-Za-z0-9])8[\s_-]*K(?![A-Za-z0-9])', re.IGNORECASE)),
+]
+
+
+def file_sha256(filepath: str, block_size: int = 1 << 20) -> str:
+    """Hash a file without reading it into memory at once."""
+    digest = hashlib.sha256()
+    with open(filepath, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def filename_ticker(filename: str, known: Optional[Iterable[str]] = None) -> Optional[str]:
+    """Ticker of a filing from its filename: the first token that is a ``known`` ticker, else the first token.
+
+    Tokens are split on anything but letters, digits and dots, so ``BRK.B_0.htm`` is ``BRK.B``.
+    """
+    tokens = re.split(r'[^A-Za-z0-9.]+', os.path.splitext(filename)[0])
+    if known is not None:
+        match = next((token for token in tokens if token in known), None)
+        if match is not None:
+            return match
+    return tokens[0] or None
+
+
+def sniff_form_type(filepath: str, head_bytes: int = 1 << 16) -> Optional[str]:
+    """Guess a filing's form type from an EDGAR ``<TYPE>`` tag, its filename or its first page.
+
+    Returns None when nothing matches or the file cannot be read, so callers keep going.
+    """
+    try:
+        with open(filepath, 'rb') as file:
+            head = file.read(head_bytes).decode("utf-8", errors="ignore")
+    except OSError as e:
+        logger.warning("Could not read filing to sniff its form type", filepath=filepath, error=str(e))
+        return None
+    match = re.search(r'<TYPE>\s*([^<\n]+)', head, re.IGNORECASE)
+    if match:
+        return match.group(1).strip().upper()
+    text = re.sub(r'<(script|style)\b.*?</\1>|<[^>]+>', ' ', head, flags=re.IGNORECASE | re.DOTALL)
+    for candidate in (os.path.basename(filepath), text):
+        for form_type, pattern in FORM_TYPE_PATTERNS:
+            if pattern.search(candidate):
+                return form_type
+    return None
+
+
+class FilingManifest:
+    """Persistent index of a filing folder.
+
+    Maps each HTML file to its ticker, filing number and filing date (taken from the
+    ``join_html_mapper.json`` next to the folder), its sniffed form type, plus path, size,
+    content hash and parse status. ``refresh`` only re-hashes files whose size or mtime changed, and lookups by
+    ticker or filing number are dictionary hits instead of directory scans.
+    """
+
+    def __init__(self,
+                 html_directory: str,
+                 mapper_path: Optional[str] = None,
+                 manifest_path: Optional[str] = None):
+        self.html_directory = html_directory
+        self.mapper_path = mapper_path or os.path.join(
+            os.path.dirname(os.path.abspath(html_directory)), MAPPER_FILENAME
+        )
+        self.manifest_path = manifest_path or os.path.join(html_directory, MANIFEST_FILENAME)
+        self.entries: Dict[str, Dict] = {}
+        self.mapper: Dict[str, Dict] = {}
+        self._mapper_mtime: Optional[float] = None
+        self._by_ticker: Dict[str, List[str]] = {}
+        self._by_num_filing: Dict[str, List[str]] = {}
+        self.load()
+
+    @property
+    def has_mapper(self) -> bool:
+        return os.path.exists(self.mapper_path)
+
+    def load(self):
+        """Load the persisted manifest, if any."""
+        if os.path.exists(self.manifest_path):
+            with open(self.manifest_path, 'r', encoding='utf-8') as file:
+                data = json.load(file)
+            self.entries = data.get("entries", {})
+            self.mapper = data.get("mapper", {})
+            self._mapper_mtime = data.get("mapper_mtime")
+        self._reindex()
+
+    def save(self):
+        """Atomically persist the manifest next to the filings."""
+        directory = os.path.dirname(os.path.abspath(self.manifest_path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump({
+                "mapper_mtime": self._mapper_mtime,
+                "mapper": self.mapper,
+                "entries": self.entries,
+            }, file)
+        os.replace(tmp_path, self.manifest_path)
+
+    def refresh_mapper(self) -> bool:
+        """Reload the mapper if it changed on disk; returns True when it was reloaded."""
+        if not self.has_mapper:
+            return False
+        mtime = os.path.getmtime(self.mapper_path)
+        if mtime == self._mapper_mtime:
+            return False
+        with open(self.mapper_path, 'r') as file:
+            self.mapper = json.load(file)
+        self._mapper_mtime = mtime
+        return True
+
+    def refresh(self) -> Dict[str, int]:
+        """Bring the manifest up to date with the folder and the mapper, then save it."""
+        counts = {"added": 0, "updated": 0, "removed": 0, "unchanged": 0}
+        mapper_changed = self.refresh_mapper()
+        filings = self._mapper_filings()
+        seen = set()
+        with os.scandir(self.html_directory) as scanned:
+            for dir_entry in scanned:
+                filename = dir_entry.name
+                if not (filename.endswith('.htm') or filename.endswith('.html')):
+                    continue
+                seen.add(filename)
+                stat = dir_entry.stat()
+                entry = self.entries.get(filename)
+                if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+                    counts["unchanged"] += 1
+                    if mapper_changed:
+                        entry.update(self._filing_info(filename, filings))
+                    if "form_type" not in entry:
+                        entry["form_type"] = sniff_form_type(dir_entry.path)
+                    continue
+                counts["updated" if entry else "added"] += 1
+                self.entries[filename] = {
+                    "path": dir_entry.path,
+                    "size": stat.st_size,
+                    "mtime": stat.st_mtime,
+                    "sha256": file_sha256(dir_entry.path),
+                    "parse_status": "pending",
+                    "form_type": sniff_form_type(dir_entry.path),
+                    **self._filing_info(filename, filings),
+                }
+        for filename in set(self.entries) - seen:
+            del self.entries[filename]
+            counts["removed"] += 1
+        self._reindex()
+        self.save()
+        logger.info("Refreshed filing manifest", directory=self.html_directory, **counts)
+        return counts
+
+    def _mapper_filings(self) -> Dict[str, Dict[str, Optional[str]]]:
+        """Index the mapper's filings by the basename of their URL."""
+        filings = {}
+        for ticker, details in self.mapper.items():
+            urls = details.get("urls", [])
+            dates = details.get("dates_filing", [None] * len(urls))
+            nums = details.get("nums_filing", [None] * len(urls))
+            for url, date_filing, num_filing in zip(urls, dates, nums):
+                filings[url.rstrip('/').rsplit('/', 1)[-1]] = {
+                    "ticker": ticker,
+                    "num_filing": num_filing,
+                    "date_filing": date_filing,
+                }
+        return filings
+
+    def _filing_info(self, filename: str, filings: Dict[str, Dict]) -> Dict[str, Optional[str]]:
+        """Resolve a file's ticker and filing details, falling back to its filename tokens."""
+        if filename in filings:
+            return dict(filings[filename])
+        return {"ticker": filename_ticker(filename, self.mapper), "num_filing": None, "date_filing": None}
+
+    def _reindex(self):
+        self._by_ticker = {}
+        self._by_num_filing = {}
+        for filename, entry in self.entries.items():
+            if entry.get("ticker"):
+                self._by_ticker.setdefault(entry["ticker"], []).append(filename)
+            if entry.get("num_filing"):
+                self._by_num_filing.setdefault(entry["num_filing"], []).append(filename)
+
+    def get(self, filename: str) -> Optional[Dict]:
+        return self.entries.get(filename)
+
+    def filing_metadata(self, filename: str) -> Dict[str, str]:
+        """The known ``FILING_FIELDS`` of a file, for document and chunk metadata."""
+        entry = self.entries.get(filename, {})
+        return {field: entry[field] for field in FILING_FIELDS if entry.get(field) is not None}
+
+    def tickers(self) -> List[str]:
+        return sorted(self._by_ticker)
+
+    def files_for_ticker(self, ticker: str) -> List[str]:
+        """Filenames of a ticker's filings, oldest filing date first."""
+        filenames = self._by_ticker.get(ticker, [])
+        return sorted(filenames, key=lambda filename: self.entries[filename].get("date_filing") or "")
+
+    def files_for_filing(self, num_filing: str) -> List[str]:
+        return list(self._by_num_filing.get(num_filing, []))
+
+    def ticker_details(self, ticker: str) -> Optional[Dict]:
+        """The mapper record (urls, filing dates and numbers) of a ticker."""
+        return self.mapper.get(ticker)
+
+    def mark_parsed(self, filename: str, success: bool = True):
+        """Record the outcome of parsing a file (persisted on the next ``save``)."""
+        if filename in self.entries:
+            self.entries[filename]["parse_status"] = "parsed" if success else "failed"
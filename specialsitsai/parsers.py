@@ -0,0 +1,293 @@
+import re
+import html as html_module
+from abc import ABC, abstractmethod
+from collections import Counter
+from functools import lru_cache
+from html.parser import HTMLParser
+from typing import Dict, Iterator, List, Optional, Type
+from bs4 import BeautifulSoup
+
+# Strings that BeautifulSoup's get_text() leaves out of the extracted text.
+SKIP_TAGS = frozenset({"script", "style", "template", "rt", "rp"})
+# Elements whose content HTML5 parsers (lxml, selectolax) keep as raw text, while html.parser,
+# and so the bs4 reference, parses it as markup. Only the first two decode entities.
+RCDATA_TAGS = frozenset({"textarea", "title"})
+RAW_TEXT_TAGS = RCDATA_TAGS | {"xmp", "iframe", "noembed", "noframes"}
+MARKUP_PATTERN = re.compile(r'<[^>]*>')
+
+
+def normalize_whitespace(text: str) -> str:
+    """Collapse every whitespace run to a single space."""
+    return re.sub(r'\s+', ' ', text).strip()
+
+
+def text_similarity(reference: str, candidate: str) -> float:
+    """Multiset Jaccard similarity of the words in two texts (1.0 means the same words)."""
+    reference_words = Counter(reference.split())
+    candidate_words = Counter(candidate.split())
+    union = sum((reference_words | candidate_words).values())
+    if not union:
+        return 1.0
+    return sum((reference_words & candidate_words).values()) / union
+
+
+def markup_to_text(raw: str, tag: str) -> str:
+    """Text html.parser extracts from markup that an HTML5 parser kept raw inside ``tag``."""
+    text = MARKUP_PATTERN.sub("\n", raw)
+    return text if tag in RCDATA_TAGS else html_module.unescape(text)
+
+
+def cdata_text(comment: str) -> Optional[str]:
+    """Content of a CDATA section that an HTML5 parser turned into a comment, else None."""
+    if comment.startswith("[CDATA[") and comment.endswith("]]"):
+        return comment[len("[CDATA["):-len("]]")]
+    return None
+
+
+class HTMLBackend(ABC):
+    """Interface for turning an HTML document into text."""
+
+    name: str = ""
+    version: str = "1"
+
+    @abstractmethod
+    def extract_text(self, html: str) -> str:
+        """Return the text content of ``html`` with its strings separated by newlines."""
+
+    def extract_file(self, filepath: str) -> str:
+        """Return the text content of the UTF-8 HTML file at ``filepath``."""
+        with open(filepath, 'r', encoding='utf-8') as file:
+            return self.extract_text(file.read())
+
+
+class BeautifulSoupBackend(HTMLBackend):
+    """Reference backend: BeautifulSoup with the pure-Python ``html.parser``."""
+
+    name = "bs4"
+
+    def extract_text(self, html: str) -> str:
+        return BeautifulSoup(html, 'html.parser').get_text(separator="\n")
+
+
+class LxmlBackend(HTMLBackend):
+    """libxml2-based backend using ``lxml.html``."""
+
+    name = "lxml"
+    version = "2"
+
+    def __init__(self):
+        try:
+            import lxml.html
+            from lxml import etree
+        except ImportError as e:
+            raise ImportError("The lxml backend requires lxml: `pip install lxml`.") from e
+        self._html = lxml.html
+        self._etree = etree
+        self._parser = lxml.html.HTMLParser(encoding="utf-8")
+
+    def extract_text(self, html: str) -> str:
+        if not html.strip():
+            return ""
+        # Encode first: lxml rejects str input that carries an XML encoding declaration.
+        try:
+            root = self._html.document_fromstring(html.encode("utf-8"), parser=self._parser)
+        except self._etree.ParserError:
+            # "Document is empty": markup without any element, e.g. only a comment.
+            return ""
+        strings = []
+        skip_depth = 0
+        for event, element in self._etree.iterwalk(root, events=("start", "end", "comment", "pi")):
+            is_tag = isinstance(element.tag, str)
+            if event in ("comment", "pi"):
+                # No start/end events for these, but the text after them still counts.
+                if not skip_depth:
+                    cdata = cdata_text(element.text or "") if event == "comment" else None
+                    if cdata:
+                        strings.append(cdata)
+                    if element.tail:
+                        strings.append(element.tail)
+                continue
+            if event == "start":
+                if is_tag and element.tag in SKIP_TAGS:
+                    skip_depth += 1
+                elif is_tag and not skip_depth and element.text:
+                    if element.tag in RAW_TEXT_TAGS:
+                        strings.append(markup_to_text(element.text, element.tag))
+                    else:
+                        strings.append(element.text)
+            else:
+                if is_tag and element.tag in SKIP_TAGS:
+                    skip_depth -= 1
+                if not skip_depth and element.tail:
+                    strings.append(element.tail)
+        return "\n".join(strings)
+
+
+class SelectolaxBackend(HTMLBackend):
+    """Lexbor-based backend using ``selectolax``."""
+
+    name = "selectolax"
+    version = "2"
+
+    def __init__(self):
+        try:
+            from selectolax.lexbor import LexborHTMLParser
+        except ImportError as e:
+            raise ImportError("The selectolax backend requires selectolax: `pip install selectolax`.") from e
+        self._parser_cls = LexborHTMLParser
+
+    def extract_text(self, html: str) -> str:
+        tree = self._parser_cls(html)
+        tree.strip_tags(list(SKIP_TAGS))
+        if tree.root is None:
+            return ""
+        # Replace nodes only after collecting them: lexbor crashes when the tree changes mid-walk.
+        for node in tree.css(", ".join(sorted(RAW_TEXT_TAGS))):
+            node.replace_with(markup_to_text(node.text(), node.tag))
+        if "<![CDATA[" in html:
+            comments = [node for node in tree.root.traverse(include_text=True) if node.tag == "-comment"]
+            for node in comments:
+                cdata = cdata_text(node.comment_content or "")
+                if cdata is not None:
+                    node.replace_with(cdata)
+        return tree.root.text(separator="\n")
+
+
+class StreamingTextExtractor(HTMLParser):
+    """Incremental ``html.parser`` tokenizer that emits whitespace-normalized text as it is fed.
+
+    Only the unparsed tail of the input, one partial word and the text not yet ``drain``-ed are
+    buffered, so memory stays bounded by the feed size rather than the document size (the
+    exception being a single huge ``<script>``/``<style>`` body, which html.parser buffers whole).
+    """
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self._pieces: List[str] = []
+        self._carry = ""
+        self._skip_depth = 0
+        self._started = False
+
+    def _emit(self, words: List[str]):
+        if not words:
+            return
+        text = " ".join(words)
+        self._pieces.append(" " + text if self._started else text)
+        self._started = True
+
+    def _boundary(self):
+        # A tag boundary separates strings, so a pending partial word is now complete.
+        if self._carry:
+            self._emit([self._carry])
+            self._carry = ""
+
+    def handle_starttag(self, tag, attrs):
+        self._boundary()
+        if tag in SKIP_TAGS:
+            self._skip_depth += 1
+
+    def handle_endtag(self, tag):
+        self._boundary()
+        if tag in SKIP_TAGS and self._skip_depth:
+            self._skip_depth -= 1
+
+    def handle_startendtag(self, tag, attrs):
+        self._boundary()
+
+    def handle_comment(self, data):
+        self._boundary()
+
+    def handle_decl(self, decl):
+        self._boundary()
+
+    def handle_pi(self, data):
+        self._boundary()
+
+    def unknown_decl(self, data):
+        self._boundary()
+        if data.startswith("CDATA[") and not self._skip_depth:
+            self._emit(data[len("CDATA["):].split())
+
+    def handle_data(self, data):
+        if self._skip_depth:
+            return
+        data = self._carry + data
+        self._carry = ""
+        words = data.split()
+        # Text runs can be split across feed() calls, so hold back a trailing partial word.
+        if words and not data[-1].isspace():
+            self._carry = words.pop()
+        self._emit(words)
+
+    def close(self):
+        super().close()
+        self._boundary()
+
+    def drain(self) -> str:
+        """Return and forget the text emitted since the last call."""
+        text = "".join(self._pieces)
+        self._pieces.clear()
+        return text
+
+
+def iter_text_stream(filepath: str, block_size: int = 1 << 16) -> Iterator[str]:
+    """Yield the normalized text of an HTML file piece by piece, reading ``block_size`` chars at a time.
+
+    Joining the pieces gives the same text as ``normalize_whitespace`` over the full extraction.
+    """
+    extractor = StreamingTextExtractor()
+    with open(filepath, 'r', encoding='utf-8') as file:
+        for block in iter(lambda: file.read(block_size), ""):
+            extractor.feed(block)
+            text = extractor.drain()
+            if text:
+                yield text
+    extractor.close()
+    text = extractor.drain()
+    if text:
+        yield text
+
+
+class StreamingBackend(HTMLBackend):
+    """Constant-memory backend built on ``StreamingTextExtractor``."""
+
+    name = "stream"
+
+    def extract_text(self, html: str) -> str:
+        extractor = StreamingTextExtractor()
+        extractor.feed(html)
+        extractor.close()
+        return extractor.drain()
+
+    def extract_file(self, filepath: str) -> str:
+        # Feed the file block by block so the raw HTML is never held whole.
+        return "".join(iter_text_stream(filepath))
+
+
+BACKENDS: Dict[str, Type[HTMLBackend]] = {
+    BeautifulSoupBackend.name: BeautifulSoupBackend,
+    LxmlBackend.name: LxmlBackend,
+    SelectolaxBackend.name: SelectolaxBackend,
+    StreamingBackend.name: StreamingBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_backend(name: str = "bs4") -> HTMLBackend:
+    """Return the (shared) backend instance registered under ``name``."""
+    if name not in BACKENDS:
+        raise ValueError(f"Unknown HTML backend {name!r}, expected one of {sorted(BACKENDS)}")
+    return BACKENDS[name]()
+
+
+def available_backends() -> List[str]:
+    """Names of the backends whose optional dependencies are installed."""
+    names = []
+    for name in BACKENDS:
+        try:
+            get_backend(name)
+        except ImportError:
+            continue
+        names.append(name)
+    return names
+
@@ -1,40 +1,135 @@
-import os
-from concurrent.futures import ThreadPoolExecutor
+import json
+import time
+from itertools import zip_longest
 from langchain import hub
-from langchain_chroma import Chroma
 from langchain.schema import Document
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.prompts import PromptTemplate
-from langchain_community.embeddings import OllamaEmbeddings
 from langchain.output_parsers import DatetimeOutputParser
 from langchain_core.output_parsers import StrOutputParser, PydanticOutputParser
-from langchain_community.llms import Ollama
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from typing import List, Optional, Union
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
+import structlog
 
+from specialsitsai import clients
+from specialsitsai.bm25 import BM25Index, BM25Retriever, HybridRetriever
+from specialsitsai.cache import DiskCache
+from specialsitsai.chunking import SectionChunker, materialize
+from specialsitsai.concurrency import RateLimiter, call_with_retries, run_concurrently
+from specialsitsai.context import ContextAssembler, Scorer
+from specialsitsai.corpus import CorpusStore
+from specialsitsai.db import HTMLHandler
+from specialsitsai.dedup import ChunkDeduplicator
+from specialsitsai.extraction import composite_schema, fused_query, split_answers
+from specialsitsai.embeddings import CachedEmbeddings, EmbeddingCache
+from specialsitsai.index import ChromaIndex, chunk_id, content_version, document_id, embedding_model_id, where_clause
+from specialsitsai.llm_cache import LLMCache, format_instructions, parser_identity
+from specialsitsai.manifest import FILING_FIELDS
 from specialsitsai.oddlots import ODD_LOT_QUESTIONS
+from specialsitsai.summarize import HierarchicalSummarizer
+from specialsitsai.tokens import estimate_tokens
+from specialsitsai.vectorindex import NumpyIndex
+
+logger = structlog.get_logger(__name__)
+
+RETRIEVAL_MODES = ("dense", "lexical", "hybrid")
+VECTOR_BACKENDS = {"chroma": ChromaIndex, "numpy": NumpyIndex}
+
 
 class RAGSystem:
-    def __init__(self, html_files: List[dict], use_local: bool = True, embedding_context: bool = False):
+    # Chunks handed to the LLM per query (without a ``context_budget``), and candidates each
+    # ranking contributes in hybrid mode.
+    retrieval_k = 4
+    hybrid_fetch_k = 20
+    # With a ``context_budget``: candidates retrieved per query for the context assembler to rerank and pack.
+    candidate_k = 12
+
+    def __init__(self,
+                 html_files: List[dict],
+                 use_local: bool = True,
+                 embedding_context: bool = False,
+                 deduplicate: bool = True,
+                 persist_directory: Optional[str] = None,
+                 embedding_cache: Optional[EmbeddingCache] = None,
+                 max_concurrency: int = 8,
+                 rate_limiter: Optional[RateLimiter] = None,
+                 summary_cache: Optional[DiskCache] = None,
+                 llm_cache: Optional[LLMCache] = None,
+                 filters: Optional[Dict[str, Any]] = None,
+                 dedup_scope: Optional[str] = "ticker",
+                 retrieval_mode: str = "dense",
+                 vector_backend: str = "chroma",
+                 index_options: Optional[Dict[str, Any]] = None,
+                 retrieval_cache: Optional[DiskCache] = None,
+                 context_budget: Optional[int] = None,
+                 reranker: Optional[Scorer] = None):
+        if retrieval_mode not in RETRIEVAL_MODES:
+            raise ValueError(f"Unknown retrieval mode {retrieval_mode!r}, expected one of {RETRIEVAL_MODES}")
+        if vector_backend not in VECTOR_BACKENDS:
+            raise ValueError(f"Unknown vector backend {vector_backend!r}, expected one of {tuple(VECTOR_BACKENDS)}")
         self.html_files = html_files
         self.use_local = use_local
         self.embedding_context = embedding_context
+        self.deduplicate = deduplicate
+        self.persist_directory = persist_directory
+        self.embedding_cache = embedding_cache
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = rate_limiter
+        self.summary_cache = summary_cache
+        self.llm_cache = llm_cache
+        self.filters = filters
+        self.dedup_scope = dedup_scope
+        self.retrieval_mode = retrieval_mode
+        self.vector_backend = vector_backend
+        self.index_options = index_options or {}
+        self.retrieval_cache = retrieval_cache
+        self.context_budget = context_budget
+        self.context_assembler = ContextAssembler(context_budget, reranker) if context_budget else None
         self._vectorstore = None
         self._retriever = None
+        self._retrievers = {}
+        self._index = None
+        self._summarizer = None
+        self._stages = {}
+        self.timings = {}
         load_dotenv()
 
+    @classmethod
+    def from_ticker(cls, handler: HTMLHandler, ticker: str, **kwargs) -> "RAGSystem":
+        """Build a RAGSystem over one ticker's filings, selected through the handler's manifest if set."""
+        return cls(list(handler.iter_html_files(ticker=ticker)), **kwargs)
+
+    @classmethod
+    def from_corpus(cls, store: CorpusStore, ticker: Optional[str] = None, **kwargs) -> "RAGSystem":
+        """Build a RAGSystem from a parsed-corpus store, optionally limited to one ticker's filings."""
+        sources = store.sources(ticker=ticker) if ticker else None
+        return cls(list(store.iter_documents(sources)), **kwargs)
+
+    @classmethod
+    def from_index(cls, persist_directory: str, filters: Optional[Dict[str, Any]] = None, **kwargs) -> "RAGSystem":
+        """Query an already built shared index, e.g. ``filters={"ticker": "MNST"}``, without loading any filing."""
+        return cls([], persist_directory=persist_directory, filters=filters, **kwargs)
+
+    def _stage(self, name: str, build: Callable[[], Any]) -> Any:
+        """Run an index-build stage once, recording how long it took."""
+        if name not in self._stages:
+            start = time.perf_counter()
+            self._stages[name] = build()
+            self.timings[name] = time.perf_counter() - start
+            logger.info("Finished index build stage", stage=name, seconds=round(self.timings[name], 3))
+        return self._stages[name]
+
     @property
-    def documents(self):
-        with ThreadPoolExecutor() as executor:
-            documents = list(executor.map(self.create_document_from_file, self.html_files))
-            documents = [doc for sublist in documents for doc in sublist]
-        return documents
+    def documents(self) -> List[Document]:
+        """Load stage: one Document per parsed filing."""
+        return self._stage("load", lambda: [
+            doc for file in self.html_files for doc in self.create_document_from_file(file)
+        ])
     
     @staticmethod
     def create_document_from_file(file):
-        return [Document(metadata={"source": file["source"]}, page_content=file["page_content"])]
+        metadata = {field: file[field] for field in FILING_FIELDS if file.get(field) is not None}
+        return [Document(metadata={"source": file["source"], **metadata}, page_content=file["page_content"])]
     
     def generate_chunk_context(self, chunk: str, document_summary: str) -> str:
         """Use an LLM to generate chunk-specific context."""
@@ -50,76 +145,279 @@ class RAGSystem:
             input_variables=["summary", "chunk"]
         )
         prompt = prompt_template.format(summary=document_summary, chunk=chunk)
-        return self.llm.invoke(prompt).content
+        return self._invoke_llm(prompt)
 
     def create_contextualized_chunks(self, splits: List[Document], document_summary: str) -> List[Document]:
-        """Enhance each chunk with LLM-generated context."""
-        enhanced_chunks = []
-        for split in splits:
+        """Enhance each chunk with LLM-generated context.
+
+        Chunks are contextualized ``max_concurrency`` at a time under the shared ``rate_limiter``,
+        with failed calls retried with backoff.
+        """
+        def contextualize(split: Document) -> Document:
             chunk_content = split.page_content
             # Generate context for this chunk using the document summary
             chunk_context = self.generate_chunk_context(chunk_content, document_summary)
             # Append the context to the chunk content
             enhanced_chunk_content = f"{chunk_context}\n\n{chunk_content}"
-            enhanced_chunks.append(Document(metadata=split.metadata, page_content=enhanced_chunk_content))
-        return enhanced_chunks
+            return Document(metadata=split.metadata, page_content=enhanced_chunk_content)
+
+        return run_concurrently(
+            contextualize,
+            splits,
+            max_workers=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            cost=lambda split: estimate_tokens(split.page_content) + estimate_tokens(document_summary),
+            description="Contextualizing chunks",
+        )
     
+    @property
+    def summarizer(self) -> HierarchicalSummarizer:
+        if self._summarizer is None:
+            self._summarizer = HierarchicalSummarizer(
+                self._invoke_llm,
+                model_id=self.llm_model_id,
+                cache=self.summary_cache,
+                max_workers=self.max_concurrency,
+                rate_limiter=self.rate_limiter,
+            )
+        return self._summarizer
+
     def get_document_summary(self, documents: List[Document]) -> str:
-        """Use an LLM to generate a summary of the entire document."""
-        combined_content = "\n\n".join(doc.page_content for doc in documents)
-        prompt_template = PromptTemplate(
-            template="""
-            Summarize the following document in a concise manner:
-            {document}
-            
-            Summary:""",
-            input_variables=["document"]
-        )
-        prompt = prompt_template.format(document=combined_content)
-        return self.llm.invoke(prompt).content
+        """Use an LLM to summarize the documents map-reduce style, one cached summary per document."""
+        return self.summarizer.summarize_documents(documents)
     
+    @property
+    def splits(self) -> List[Document]:
+        """Split stage: section-aware chunks of every document, near-duplicates collapsed."""
+        return self._stage("split", self._split)
+
+    def _split(self) -> List[Document]:
+        documents = self.documents
+        spans = SectionChunker(chunk_size=2000, chunk_overlap=300).split_documents(documents)
+        texts = {doc.metadata["source"]: doc.page_content for doc in documents}
+        metadata = {doc.metadata["source"]: doc.metadata for doc in documents}
+        splits = list(materialize(spans, texts, metadata))
+        if self.deduplicate:
+            splits = ChunkDeduplicator().deduplicate(splits, scope_key=self.scope_key)
+        return splits
+
+    @property
+    def scope_key(self) -> Optional[str]:
+        """``dedup_scope`` when it matters: on a persisted (possibly shared) index, or when every file has it.
+
+        Otherwise chunks would fall back to one scope per file and nothing would be collapsed across filings.
+        """
+        if not self.dedup_scope:
+            return None
+        if self.persist_directory or all(file.get(self.dedup_scope) is not None for file in self.html_files):
+            return self.dedup_scope
+        return None
+
+    @property
+    def index_variant(self) -> str:
+        return "contextual" if self.embedding_context else ""
+
+    @property
+    def index(self) -> Union[ChromaIndex, NumpyIndex]:
+        """The (possibly persisted) ``vector_backend`` index for the embedding model; opening it embeds nothing.
+
+        ``index_options`` go to the backend, e.g. ``{"quantization": "int8"}`` for ``NumpyIndex``.
+        Contextualized chunks get a collection of their own, so the plain and contextual variants
+        never delete each other's chunks or mix in one ranking.
+        """
+        if self._index is None:
+            embedding = self.get_embedding_model()
+            options = dict(self.index_options)
+            if self.index_variant:
+                options["collection_prefix"] = f"{options.get('collection_prefix', 'specialsitsai')}-{self.index_variant}"
+            self._index = VECTOR_BACKENDS[self.vector_backend](
+                embedding, embedding_model_id(embedding), persist_directory=self.persist_directory, **options
+            )
+        return self._index
+
+    def _contextualize(self) -> Tuple[List[str], List[Document]]:
+        """Contextualize stage: the chunks missing from the index, with LLM context if enabled."""
+        missing = self.index.missing(self.splits, self.index_variant, scope_key=self.scope_key)
+        ids = [split_id for split_id, _ in missing]
+        splits = [split for _, split in missing]
+        if self.embedding_context and splits:
+            # Contextualize each chunk against the summary of the filing it came from.
+            texts = {doc.metadata["source"]: doc.page_content for doc in self.documents}
+            by_source = {}
+            for position, split in enumerate(splits):
+                by_source.setdefault(split.metadata["source"], []).append(position)
+            for source, positions in by_source.items():
+                document_summary = self.summarizer.summarize_text(texts[source])
+                contextualized = self.create_contextualized_chunks([splits[i] for i in positions], document_summary)
+                for i, split in zip(positions, contextualized):
+                    splits[i] = split
+        return ids, splits
+
+    def _embed(self) -> List[List[float]]:
+        """Embed stage: vectors for the new chunks only."""
+        _, splits = self._stage("contextualize", self._contextualize)
+        if not splits:
+            return []
+        return self.index.embedding.embed_documents([split.page_content for split in splits])
+
+    def _store(self):
+        """Store stage: upsert the new chunks and drop the ones the current filings no longer produce."""
+        ids, splits = self._stage("contextualize", self._contextualize)
+        vectors = self._stage("embed", self._embed)
+        self.index.add(ids, splits, embeddings=vectors)
+        keep_ids = {
+            document_id(split, self.index.model_id, self.index_variant, self.scope_key) for split in self.splits
+        }
+        self.index.delete_stale([file["source"] for file in self.html_files], keep_ids)
+        if isinstance(self.index.embedding, CachedEmbeddings):
+            logger.info("Embedding cache usage", **self.index.embedding.stats())
+
+    def build_index(self):
+        """Run load -> split -> contextualize -> embed -> store, each stage at most once."""
+        # Run the stages in order so each one's timing excludes the stages it depends on.
+        self.documents
+        self.splits
+        self._stage("contextualize", self._contextualize)
+        self._stage("embed", self._embed)
+        self._stage("store", self._store)
+        return self.index.store
+
+    def close(self):
+        """Release the vector index; an in-memory Chroma collection is otherwise kept for the whole process."""
+        if self._index is not None:
+            self._index.close()
+            self._index = None
+            self._vectorstore = None
+            self._retrievers = {}
+            # A later query reopens the index and runs the stages that touch it again.
+            for stage in ("contextualize", "embed", "store", "version"):
+                self._stages.pop(stage, None)
+
     @property
     def vectorstore(self):
-        """Lazily create the vector store and cache the result."""
+        """Lazily build (or open and update) the vector store and cache the result.
+
+        Chunks are keyed by content hash and embedding model, so with ``persist_directory`` set
+        only chunks missing from the stored index are contextualized and embedded, and chunks
+        the current filings no longer produce are deleted.
+        """
         if not self._vectorstore:
-            text_splitter = RecursiveCharacterTextSplitter(chunk_size=2000, chunk_overlap=300)
-            splits = text_splitter.split_documents(self.documents)
-            if self.embedding_context == True:
-                document_summary = self.get_document_summary(self.documents)
-                contextualized_splits = self.create_contextualized_chunks(splits, document_summary)
-                self._vectorstore = Chroma.from_documents(documents=contextualized_splits, embedding=self.get_embedding_model())
-            self._vectorstore = Chroma.from_documents(documents=splits, embedding=self.get_embedding_model())
+            self._vectorstore = self.build_index()
         return self._vectorstore
   
     def get_embedding_model(self):
-        """Select the embedding model based on the configuration."""
+        """Select the embedding model based on the configuration, behind the embedding cache if set."""
         if self.use_local:
-            return OllamaEmbeddings(model="llama3")  # Example local model
+            embedding = clients.get_embeddings("ollama", "llama3")  # Example local model
         else:
-            openai_api_key = os.getenv("OPENAI_API_KEY")
-            return OpenAIEmbeddings(openai_api_key=openai_api_key)  # Example OpenAI model
+            embedding = clients.get_embeddings("openai")  # Example OpenAI model
+        if self.embedding_cache is not None:
+            return CachedEmbeddings(embedding, self.embedding_cache)
+        return embedding
+
+    @property
+    def default_filters(self) -> Optional[Dict[str, Any]]:
+        """``filters``, or for a persisted (possibly shared) index the tickers or sources of ``html_files``."""
+        if self.filters is not None or not self.persist_directory or not self.html_files:
+            return self.filters
+        tickers = {file.get("ticker") for file in self.html_files}
+        if None not in tickers:
+            return {"ticker": sorted(tickers)}
+        return {"source": [file["source"] for file in self.html_files]}
+
+    @property
+    def lexical_index(self) -> BM25Index:
+        """BM25 index of this system's chunks, or of the stored index's chunks when built ``from_index``."""
+        return self._stage("lexical", lambda: BM25Index(self.splits if self.html_files else self.index.documents()))
+
+    def _dense_retriever(self, filters: Optional[Dict[str, Any]], k: int):
+        self.vectorstore
+        return self.index.retriever(k, filters)
+
+    @property
+    def search_k(self) -> int:
+        """Chunks retrieved per query: extra candidates when a context assembler picks among them."""
+        return self.candidate_k if self.context_assembler is not None else self.retrieval_k
+
+    def retriever_for(self, filters: Optional[Dict[str, Any]] = None):
+        """Retriever for ``retrieval_mode`` limited to chunks whose metadata matches ``filters`` (see ``where_clause``).
+
+        "dense" ranks by embedding similarity, "lexical" by BM25 without any embedding call, and
+        "hybrid" fuses both rankings with reciprocal rank fusion.
+        """
+        where = where_clause(filters)
+        key = repr(where)
+        if key not in self._retrievers:
+            if self.retrieval_mode == "dense":
+                retriever = self._dense_retriever(filters, self.search_k)
+            elif self.retrieval_mode == "lexical":
+                retriever = BM25Retriever(index=self.lexical_index, k=self.search_k, filters=filters)
+            else:
+                retriever = HybridRetriever(
+                    retrievers=[
+                        self._dense_retriever(filters, self.hybrid_fetch_k),
+                        BM25Retriever(index=self.lexical_index, k=self.hybrid_fetch_k, filters=filters),
+                    ],
+                    k=self.search_k,
+                )
+            self._retrievers[key] = retriever
+        return self._retrievers[key]
 
     @property
     def retriever(self):
-        """Lazily set up the retriever."""
+        """Lazily set up the retriever, limited to ``default_filters``."""
         if not self._retriever:
-            self._retriever = self.vectorstore.as_retriever()
+            self._retriever = self.retriever_for(self.default_filters)
         return self._retriever
 
     @property
     def llm(self):
         return self.get_llm()
+
+    @property
+    def llm_model_id(self) -> str:
+        llm = self.llm
+        return f"{type(llm).__name__}:{getattr(llm, 'model_name', None) or getattr(llm, 'model', '')}"
+
+    def _invoke_llm(self,
+                    prompt: str,
+                    parser_id: str = "",
+                    use_cache: bool = True,
+                    parse: Optional[Callable[[str], Any]] = None) -> Any:
+        """Invoke the LLM on a rendered prompt, going through ``llm_cache`` if set.
+
+        Returns the response text, or ``parse(text)`` when a parser is given; responses are only
+        cached once they parse, so a malformed answer is retried rather than replayed.
+        """
+        key = None
+        if self.llm_cache is not None and use_cache:
+            key = LLMCache.make_key(self.llm_model_id, prompt, parser_id)
+            cached = self.llm_cache.get(key)
+            if cached is not None:
+                return parse(cached) if parse else cached
+        result = self.llm.invoke(prompt)
+        # Chat models return messages, completion models plain strings.
+        text = getattr(result, "content", result)
+        parsed = parse(text) if parse else text
+        if key is not None:
+            self.llm_cache.put(key, text)
+        return parsed
     
     def get_llm(self):
-        """Select the language model based on the configuration."""
+        """Select the language model based on the configuration, from the shared client registry."""
         if self.use_local:
-            return Ollama(model="llama3")  
-        return ChatOpenAI(model="gpt-4o-mini")
+            return clients.get_llm("ollama", "llama3")
+        return clients.get_llm("openai", "gpt-4o-mini")
 
     def rag_invoke(self, 
                    parser: Union[PydanticOutputParser,StrOutputParser, DatetimeOutputParser],
-                   content: dict):
-        """General method for retrieving information based on prompt type."""
+                   content: dict,
+                   use_cache: bool = True):
+        """General method for retrieving information based on prompt type.
+
+        Identical requests are answered from ``llm_cache`` unless ``use_cache`` is False.
+        """
+        instructions = format_instructions(parser)
         prompt = PromptTemplate(
             template="""
             You are an assistant for question-answering tasks. Use the following pieces of retrieved context to answer the question. 
@@ -127,20 +425,125 @@ class RAGSystem:
             Context: {context}
             Answer:""",
             input_variables=["query"],
-            partial_variables={"format_instructions": parser.get_format_instructions()},
+            partial_variables={"format_instructions": instructions},
+        )
+        return self._invoke_llm(
+            prompt.format(**content),
+            parser_id=parser_identity(parser),
+            use_cache=use_cache,
+            parse=parser.parse,
         )
-        rag_chain = prompt | self.llm | parser
-        return rag_chain.invoke(content)
     
-    def query_questions(self, questions: dict):
-        responses = {}
-        for key, question in questions.items():
-            parser = question["parser"]
-            retrieved_docs = self.retriever.invoke(question["query"])
-            combined_content = "\n\n".join(doc.page_content for doc in retrieved_docs)
-            responses[key] = self.rag_invoke(parser, {"context": combined_content, "query": question["query"]})
-        return responses
-
-    def query_oddlot_details(self, questions=ODD_LOT_QUESTIONS):
+    @property
+    def index_version(self) -> str:
+        """Hash of the chunks retrieval runs over, as of the last build; keys the retrieval cache."""
+        def version() -> str:
+            if self.retrieval_mode == "lexical":
+                return content_version(
+                    chunk_id(doc.page_content, "lexical", doc.metadata.get("source", ""))
+                    for doc in self.lexical_index.documents
+                )
+            self.vectorstore
+            return self.index.version()
+        return self._stage("version", version)
+
+    def register_questions(self, questions: dict):
+        """Embed a question set's queries ahead of time; with ``embedding_cache`` they persist across runs."""
+        embedding = self.index.embedding
+        if not isinstance(embedding, CachedEmbeddings):
+            logger.warning("No embedding cache configured, query embeddings will not be kept")
+            return
+        embedding.embed_queries(list(dict.fromkeys(question["query"] for question in questions.values())))
+
+    def _retrieval_key(self, query: str, filters: Optional[Dict[str, Any]]) -> str:
+        return DiskCache.make_key(
+            "retrieval", self.index_version, self.retrieval_mode, str(self.search_k), repr(where_clause(filters)), query
+        )
+
+    def _retrieve(self, queries: List[str], filters: Optional[Dict[str, Any]] = None) -> Dict[str, List[Document]]:
+        """Retrieved chunks for each distinct query, each query run once.
+
+        With a ``retrieval_cache`` results are reused for the same index version, query and
+        filters, so repeated runs neither embed the query nor search again.
+        """
+        retriever = self.retriever if filters is None else self.retriever_for(filters)
+        effective_filters = self.default_filters if filters is None else filters
+        queries = list(dict.fromkeys(queries))
+        results = {}
+        if self.retrieval_cache is not None:
+            for query in queries:
+                cached = self.retrieval_cache.get(self._retrieval_key(query, effective_filters))
+                if cached is not None:
+                    results[query] = [Document(**doc) for doc in json.loads(cached)]
+        pending = [query for query in queries if query not in results]
+        retrieved = run_concurrently(
+            retriever.invoke, pending, max_workers=self.max_concurrency, description="Retrieving context"
+        )
+        for query, docs in zip(pending, retrieved):
+            results[query] = docs
+            if self.retrieval_cache is not None:
+                self.retrieval_cache.put(
+                    self._retrieval_key(query, effective_filters),
+                    json.dumps([{"page_content": doc.page_content, "metadata": doc.metadata} for doc in docs]),
+                )
+        return {query: results[query] for query in queries}
+
+    def query_questions(self, questions: dict, fused: bool = False, filters: Optional[Dict[str, Any]] = None):
+        """Answer a question set: each distinct query is retrieved once, then the LLM calls run concurrently.
+
+        With ``fused`` the whole set is answered by one structured call over the union of the
+        retrieved chunks, returning the same per-key dict. ``filters`` overrides the retrieval scope,
+        e.g. ``{"ticker": ["MNST", "AAPL"]}`` for a cross-ticker question.
+        """
+        if fused:
+            return self._query_fused(questions, filters)
+        retrieved = self._retrieve([question["query"] for question in questions.values()], filters)
+        contexts = {query: self.build_context(query, retrieved_docs) for query, retrieved_docs in retrieved.items()}
+
+        def answer(key: str):
+            question = questions[key]
+            return self.rag_invoke(question["parser"], {"context": contexts[question["query"]], "query": question["query"]})
+
+        keys = list(questions)
+        answers = run_concurrently(
+            answer,
+            keys,
+            max_workers=self.max_concurrency,
+            rate_limiter=self.rate_limiter,
+            cost=lambda key: estimate_tokens(contexts[questions[key]["query"]]),
+            description="Answering questions",
+        )
+        return dict(zip(keys, answers))
+
+    def build_context(self, query: str, documents: List[Document], token_budget: Optional[int] = None) -> str:
+        """Prompt context from retrieved chunks: reranked and packed into the budget by ``context_assembler``."""
+        if self.context_assembler is None:
+            return "\n\n".join(doc.page_content for doc in documents)
+        return self.context_assembler.assemble(query, documents, token_budget)
+
+    def _query_fused(self, questions: dict, filters: Optional[Dict[str, Any]] = None):
+        retrieved = self._retrieve([question["query"] for question in questions.values()], filters)
+        # Interleave the rankings so the union keeps every query's best chunks near the top.
+        union = {}
+        for rank_docs in zip_longest(*retrieved.values()):
+            for doc in rank_docs:
+                if doc is not None:
+                    union.setdefault((doc.metadata.get("source"), doc.page_content), doc)
+        budget = self.context_budget * len(retrieved) if self.context_budget else None
+        context = self.build_context(" ".join(retrieved), list(union.values()), budget)
+        parser = PydanticOutputParser(pydantic_object=composite_schema(questions))
+
+        def attempt():
+            # Every attempt, retries included, pays for its tokens.
+            if self.rate_limiter is not None:
+                self.rate_limiter.acquire(estimate_tokens(context))
+            return self.rag_invoke(parser, {"context": context, "query": fused_query(questions)})
+
+        return split_answers(call_with_retries(attempt), questions)
+
+    def query_oddlot_details(self,
+                             questions=ODD_LOT_QUESTIONS,
+                             fused: bool = False,
+                             filters: Optional[Dict[str, Any]] = None):
         """Method to ask multiple questions about the OddLot tender."""
-        return self.query_questions(questions)
+        return self.query_questions(questions, fused=fused, filters=filters)
@@ -0,0 +1,27 @@
+from pydantic import BaseModel, Field
+from langchain.output_parsers import DatetimeOutputParser
+from langchain_core.output_parsers import StrOutputParser, PydanticOutputParser
+
+
+class SpinoffGeneral(BaseModel):
+    parent_company: str = Field(description="The name of the parent company carrying out the spinoff.")
+    spinoff_company: str = Field(description="The name of the company being spun off.")
+    distribution_ratio: str = Field(description="How many shares of the spinoff company shareholders receive per share of the parent company.")
+    business_description: str = Field(description="A short description of the business of the spinoff company.")
+    tax_consequences: str = Field(description="Whether the distribution is expected to be tax-free to shareholders, and any caveats.")
+
+
+SPINOFF_QUESTIONS = {
+    "distribution_date": {
+        "query": "What is the distribution date of the spinoff?",
+        "parser": DatetimeOutputParser()
+    },
+    "general": {
+        "query": "Tell me the basic information of the spinoff (parent company and spinoff company)",
+        "parser": PydanticOutputParser(pydantic_object=SpinoffGeneral)
+    },
+    "financials": {
+        "query": "Summarize the financial information of the spinoff company in no more than 400 words",
+        "parser": StrOutputParser()
+    }
+}
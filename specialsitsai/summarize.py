@@ -0,0 +1,119 @@
+from typing import Callable, List, Optional
+import structlog
+from langchain.schema import Document
+from langchain_core.prompts import PromptTemplate
+
+from specialsitsai.cache import DiskCache
+from specialsitsai.concurrency import RateLimiter, run_concurrently
+from specialsitsai.tokens import estimate_tokens
+
+logger = structlog.get_logger(__name__)
+
+MAP_PROMPT = PromptTemplate(
+    template="""
+    Summarize the following document in a concise manner:
+    {document}
+
+    Summary:""",
+    input_variables=["document"]
+)
+
+REDUCE_PROMPT = PromptTemplate(
+    template="""
+    The following are summaries of consecutive parts of one or more documents:
+    {summaries}
+
+    Combine them into a single concise summary:""",
+    input_variables=["summaries"]
+)
+
+
+class HierarchicalSummarizer:
+    """Map-reduce summarizer that never sends more than ``token_budget`` tokens of input per call.
+
+    Text is cut into budget-sized pieces that are summarized in parallel, then the summaries are
+    merged in a tree of reduce calls until one remains. Each document's summary is cached under
+    its content hash (plus model id and budget), so a filing is summarized once across runs.
+    """
+
+    def __init__(self,
+                 invoke: Callable[[str], str],
+                 model_id: str = "",
+                 token_budget: int = 6000,
+                 cache: Optional[DiskCache] = None,
+                 max_workers: int = 8,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self.invoke = invoke
+        self.model_id = model_id
+        self.token_budget = token_budget
+        self.cache = cache
+        self.max_workers = max_workers
+        self.rate_limiter = rate_limiter
+
+    def _run(self, prompts: List[str], description: str) -> List[str]:
+        return run_concurrently(
+            self.invoke,
+            prompts,
+            max_workers=self.max_workers,
+            rate_limiter=self.rate_limiter,
+            cost=estimate_tokens,
+            description=description,
+        )
+
+    def _pieces(self, text: str) -> List[str]:
+        """Cut text into budget-sized pieces on whitespace."""
+        max_chars = self.token_budget * 4
+        pieces = []
+        start = 0
+        while start < len(text):
+            end = min(start + max_chars, len(text))
+            if end < len(text):
+                space = text.rfind(' ', start + max_chars // 2, end)
+                end = space if space != -1 else end
+            pieces.append(text[start:end])
+            start = end
+        return pieces
+
+    def _reduce(self, summaries: List[str]) -> str:
+        """Merge summaries level by level, each call taking as many as fit in the budget."""
+        level = 0
+        while len(summaries) > 1:
+            groups: List[List[str]] = [[]]
+            for summary in summaries:
+                group_tokens = sum(estimate_tokens(member) for member in groups[-1])
+                if len(groups[-1]) >= 2 and group_tokens + estimate_tokens(summary) > self.token_budget:
+                    groups.append([])
+                groups[-1].append(summary)
+            level += 1
+            summaries = self._run(
+                [REDUCE_PROMPT.format(summaries="\n\n".join(group)) for group in groups],
+                description=f"Reducing summaries (level {level})",
+            )
+        return summaries[0]
+
+    def _cached(self, key_text: str, build: Callable[[], str]) -> str:
+        if self.cache is None:
+            return build()
+        key = DiskCache.make_key("summary", self.model_id, str(self.token_budget), key_text)
+        summary = self.cache.get(key)
+        if summary is None:
+            summary = build()
+            self.cache.put(key, summary)
+        return summary
+
+    def summarize_text(self, text: str) -> str:
+        """Summary of one document."""
+        def build() -> str:
+            summaries = self._run(
+                [MAP_PROMPT.format(document=piece) for piece in self._pieces(text)],
+                description="Summarizing document pieces",
+            )
+            return self._reduce(summaries) if summaries else ""
+        return self._cached(text, build)
+
+    def summarize_documents(self, documents: List[Document]) -> str:
+        """Summary of several documents: each is summarized (or read from cache) then merged."""
+        summaries = [self.summarize_text(document.page_content) for document in documents]
+        if len(summaries) == 1:
+            return summaries[0]
+        return self._cached("\0".join(summaries), lambda: self._reduce(summaries) if summaries else "")
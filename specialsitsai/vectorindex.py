@@ -0,0 +1,354 @@
+import os
+import json
+import hashlib
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+import numpy as np
+import structlog
+from langchain.schema import Document
+from langchain_core.callbacks import CallbackManagerForRetrieverRun
+from langchain_core.embeddings import Embeddings
+from langchain_core.retrievers import BaseRetriever
+
+from specialsitsai.index import collection_name_for, content_version, document_id
+
+logger = structlog.get_logger(__name__)
+
+
+def normalize_rows(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length so a dot product is the cosine similarity; zero rows stay zero."""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1, norms)
+
+
+def quantize_int8(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Per-dimension scalar quantization: ``vectors ~= (codes + 128) * scale + offset``."""
+    vectors = np.asarray(vectors, dtype=np.float32)
+    offset = vectors.min(axis=0)
+    scale = (vectors.max(axis=0) - offset) / 255
+    scale[scale == 0] = 1
+    codes = (np.rint((vectors - offset) / scale) - 128).astype(np.int8)
+    return codes, scale.astype(np.float32), offset.astype(np.float32)
+
+
+class NumpyIndex:
+    """In-process vector index: one matrix of normalized embeddings searched by matrix product.
+
+    Meant for per-ticker corpora of a few thousand chunks, where starting Chroma costs more than
+    the search. With a ``persist_directory`` the matrix is saved as ``vectors.npy`` (read back
+    through a memory map, so opening it loads nothing) next to ``chunks.json`` holding ids,
+    texts and metadata; every write rewrites both files. ``dtype`` float16 halves the matrix at a
+    small cost in precision. Metadata filters are answered with boolean masks cached per value.
+    It offers the same interface as ``ChromaIndex``.
+
+    With ``quantization="int8"`` an int8 copy of the matrix (a quarter of float32) is held in
+    memory and scanned instead; the best ``rerank_factor * k`` candidates are then re-scored
+    exactly from the full-precision rows, which stay on disk in the ``persist_directory`` (so
+    one is required) and are only paged in for those candidates. ``recall_at_k`` measures what
+    this costs.
+    """
+
+    VECTORS_FILENAME = "vectors.npy"
+    CHUNKS_FILENAME = "chunks.json"
+    CODES_FILENAME = "codes.npz"
+    QUANTIZATIONS = (None, "int8")
+    # Rows scored per block when scanning the int8 codes, bounding the float32 temporaries.
+    scan_block = 65536
+
+    def __init__(self,
+                 embedding: Embeddings,
+                 model_id: str,
+                 persist_directory: Optional[str] = None,
+                 collection_prefix: str = "specialsitsai",
+                 dtype: str = "float32",
+                 quantization: Optional[str] = None,
+                 rerank_factor: int = 8):
+        if quantization not in self.QUANTIZATIONS:
+            raise ValueError(f"Unknown quantization {quantization!r}, expected one of {self.QUANTIZATIONS}")
+        if quantization and not persist_directory:
+            # In memory the codes would sit next to the full matrix and only add to it.
+            raise ValueError("Quantization needs a persist_directory to keep the full-precision vectors on disk")
+        self.model_id = model_id
+        self.embedding = embedding
+        self.dtype = np.dtype(dtype)
+        self.quantization = quantization
+        self.rerank_factor = rerank_factor
+        self.directory = (
+            os.path.join(persist_directory, collection_name_for(collection_prefix, model_id))
+            if persist_directory else None
+        )
+        self._ids: List[str] = []
+        self._texts: List[str] = []
+        self._metadatas: List[Dict[str, Any]] = []
+        self._positions: Dict[str, int] = {}
+        self._vectors: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scale: Optional[np.ndarray] = None
+        self._offset: Optional[np.ndarray] = None
+        self._masks: Dict[Tuple[str, Any], np.ndarray] = {}
+        if self.directory and os.path.exists(os.path.join(self.directory, self.CHUNKS_FILENAME)):
+            self._load()
+
+    @property
+    def store(self) -> "NumpyIndex":
+        # RAGSystem hands out ``index.store`` as its vector store; this index is its own store.
+        return self
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def _load(self):
+        with open(os.path.join(self.directory, self.CHUNKS_FILENAME), 'r', encoding='utf-8') as file:
+            chunks = json.load(file)
+        self._set_chunks(chunks["ids"], chunks["documents"], chunks["metadatas"])
+        self._vectors = np.load(os.path.join(self.directory, self.VECTORS_FILENAME), mmap_mode='r')
+        if not self.quantization:
+            return
+        codes_path = os.path.join(self.directory, self.CODES_FILENAME)
+        if os.path.exists(codes_path):
+            with np.load(codes_path) as stored:
+                if "rows" in stored and str(stored["rows"]) == self._rows_version():
+                    self._codes, self._scale, self._offset = stored["codes"], stored["scale"], stored["offset"]
+        if self._codes is None:
+            # Written without quantization since (or by an older version): quantize once and keep it.
+            self._save(self._vectors)
+
+    def _rows_version(self) -> str:
+        """Hash of the ids in row order: codes are only valid for the exact rows they were computed from."""
+        digest = hashlib.sha256()
+        for id_ in self._ids:
+            digest.update(id_.encode("utf-8"))
+            digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _set_chunks(self, ids: List[str], texts: List[str], metadatas: List[Dict[str, Any]]):
+        self._ids, self._texts, self._metadatas = ids, texts, metadatas
+        self._positions = {id_: position for position, id_ in enumerate(ids)}
+        self._masks = {}
+
+    def _save(self, vectors: np.ndarray):
+        """Replace the stored chunks and matrix (and codes), then map the matrix back in."""
+        if self.quantization:
+            self._codes, self._scale, self._offset = quantize_int8(vectors)
+        if not self.directory:
+            self._vectors = vectors
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npy")
+        with os.fdopen(fd, 'wb') as file:
+            np.save(file, vectors)
+        os.replace(tmp_path, os.path.join(self.directory, self.VECTORS_FILENAME))
+        if self.quantization:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".npz")
+            with os.fdopen(fd, 'wb') as file:
+                np.savez(
+                    file, codes=self._codes, scale=self._scale, offset=self._offset, rows=self._rows_version()
+                )
+            os.replace(tmp_path, os.path.join(self.directory, self.CODES_FILENAME))
+        elif os.path.exists(os.path.join(self.directory, self.CODES_FILENAME)):
+            # The rows are changing without new codes; stale ones must not be picked up later.
+            os.remove(os.path.join(self.directory, self.CODES_FILENAME))
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, 'w', encoding='utf-8') as file:
+            json.dump({"ids": self._ids, "documents": self._texts, "metadatas": self._metadatas}, file)
+        os.replace(tmp_path, os.path.join(self.directory, self.CHUNKS_FILENAME))
+        self._vectors = np.load(os.path.join(self.directory, self.VECTORS_FILENAME), mmap_mode='r')
+
+    def ids(self) -> Set[str]:
+        return set(self._ids)
+
+    def version(self) -> str:
+        return content_version(self._ids)
+
+    def ids_for_source(self, source: str) -> Set[str]:
+        return {self._ids[i] for i in np.flatnonzero(self.mask({"source": source}))}
+
+    def documents(self, filters: Optional[Dict[str, Any]] = None) -> List[Document]:
+        """Stored chunks matching ``filters``, without their vectors."""
+        return [self._document(i) for i in np.flatnonzero(self.mask(filters))]
+
+    def _document(self, position: int) -> Document:
+        return Document(page_content=self._texts[position], metadata=self._metadatas[position])
+
+    def missing(self,
+                documents: Iterable[Document],
+                variant: str = "",
+                scope_key: Optional[str] = None) -> List[Tuple[str, Document]]:
+        """(id, document) pairs for the documents not in the index yet, each id once."""
+        missing = {}
+        for document in documents:
+            id_ = document_id(document, self.model_id, variant, scope_key)
+            if id_ not in self._positions and id_ not in missing:
+                missing[id_] = document
+        return list(missing.items())
+
+    def add(self, ids: List[str], documents: List[Document], embeddings: Optional[List[List[float]]] = None):
+        """Upsert documents under the given ids, embedding them unless ``embeddings`` are passed."""
+        if not ids:
+            return
+        if embeddings is None:
+            embeddings = self.embedding.embed_documents([document.page_content for document in documents])
+        new_vectors = normalize_rows(np.asarray(embeddings, dtype=np.float32)).astype(self.dtype)
+        replaced = set(ids)
+        keep = [i for i, id_ in enumerate(self._ids) if id_ not in replaced]
+        old_vectors = (
+            np.asarray(self._vectors)[keep] if self._vectors is not None
+            else np.empty((0, new_vectors.shape[1]), dtype=self.dtype)
+        )
+        self._set_chunks(
+            [self._ids[i] for i in keep] + list(ids),
+            [self._texts[i] for i in keep] + [document.page_content for document in documents],
+            [self._metadatas[i] for i in keep] + [document.metadata for document in documents],
+        )
+        self._save(np.concatenate([old_vectors, new_vectors]))
+        logger.info("Added chunks to index", count=len(ids), model_id=self.model_id)
+
+    def delete(self, ids: Iterable[str]):
+        ids = set(ids) & set(self._positions)
+        if not ids:
+            return
+        keep = [i for i, id_ in enumerate(self._ids) if id_ not in ids]
+        vectors = np.asarray(self._vectors)[keep]
+        self._set_chunks(
+            [self._ids[i] for i in keep], [self._texts[i] for i in keep], [self._metadatas[i] for i in keep]
+        )
+        self._save(vectors)
+        logger.info("Deleted chunks from index", count=len(ids), model_id=self.model_id)
+
+    def delete_stale(self, sources: Iterable[str], keep_ids: Set[str]):
+        """Delete chunks of ``sources`` that are no longer produced by the current documents."""
+        stale = set()
+        for source in sources:
+            stale |= self.ids_for_source(source) - keep_ids
+        self.delete(stale)
+
+    def _value_mask(self, key: str, value: Any) -> np.ndarray:
+        if (key, value) not in self._masks:
+            self._masks[(key, value)] = np.fromiter(
+                (metadata.get(key) == value for metadata in self._metadatas), dtype=bool, count=len(self._ids)
+            )
+        return self._masks[(key, value)]
+
+    def mask(self, filters: Optional[Dict[str, Any]] = None) -> np.ndarray:
+        """Rows whose metadata matches ``filters`` (same semantics as ``where_clause``)."""
+        mask = np.ones(len(self._ids), dtype=bool)
+        for key, value in (filters or {}).items():
+            if isinstance(value, (list, tuple, set)):
+                any_of = np.zeros(len(self._ids), dtype=bool)
+                for item in value:
+                    any_of |= self._value_mask(key, item)
+                mask &= any_of
+            else:
+                mask &= self._value_mask(key, value)
+        return mask
+
+    def _approximate_scores(self, queries: np.ndarray) -> np.ndarray:
+        """Dot products with the dequantized rows, computed block by block from the int8 codes."""
+        # q . ((c + 128) * scale + offset) = (q * scale) . c + q . (128 * scale + offset)
+        weights = (queries * self._scale).T
+        bias = queries @ (128 * self._scale + self._offset)
+        scores = np.empty((len(queries), len(self._codes)), dtype=np.float32)
+        for start in range(0, len(self._codes), self.scan_block):
+            block = self._codes[start:start + self.scan_block].astype(np.float32)
+            scores[:, start:start + len(block)] = (block @ weights).T
+        return scores + bias[:, None]
+
+    def _exact_scores(self, query: np.ndarray, rows: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Full-precision scores of ``rows``, returned with the rows in the (sorted) order scored."""
+        # Sorted rows read the memory map front to back.
+        rows = np.sort(rows)
+        return np.asarray(self._vectors[rows], dtype=np.float32) @ query, rows
+
+    def search_by_vectors(self,
+                          queries: np.ndarray,
+                          k: int = 4,
+                          filters: Optional[Dict[str, Any]] = None,
+                          exact: bool = False) -> List[List[Tuple[Document, float]]]:
+        """Top ``k`` chunks by cosine similarity for each row of ``queries``, in one matrix product.
+
+        A quantized index scans its int8 codes and re-scores a shortlist exactly, unless ``exact``.
+        """
+        if not self._ids:
+            return [[] for _ in range(len(queries))]
+        queries = normalize_rows(np.atleast_2d(np.asarray(queries, dtype=np.float32)))
+        mask = self.mask(filters)
+        k = min(k, int(mask.sum()))
+        if k == 0:
+            return [[] for _ in range(len(queries))]
+        approximate = self._codes is not None and not exact
+        scores = self._approximate_scores(queries) if approximate else (
+            queries @ np.asarray(self._vectors, dtype=np.float32).T
+        )
+        scores[:, ~mask] = -np.inf
+        shortlist = min(k * self.rerank_factor, int(mask.sum())) if approximate else k
+        top = np.argpartition(-scores, shortlist - 1, axis=1)[:, :shortlist]
+        results = []
+        for query, row, candidates in zip(queries, scores, top):
+            if approximate:
+                candidate_scores, candidates = self._exact_scores(query, candidates)
+            else:
+                candidate_scores = row[candidates]
+            order = np.argsort(-candidate_scores, kind="stable")[:k]
+            results.append([(self._document(candidates[i]), float(candidate_scores[i])) for i in order])
+        return results
+
+    def recall_at_k(self,
+                    queries: np.ndarray,
+                    k: int = 10,
+                    filters: Optional[Dict[str, Any]] = None) -> float:
+        """Share of the exact top ``k`` chunks that the (quantized) search also returns."""
+        found = self.search_by_vectors(queries, k, filters)
+        expected = self.search_by_vectors(queries, k, filters, exact=True)
+        hits = total = 0
+        for found_results, expected_results in zip(found, expected):
+            found_texts = {document.page_content for document, _ in found_results}
+            hits += sum(document.page_content in found_texts for document, _ in expected_results)
+            total += len(expected_results)
+        recall = hits / total if total else 1.0
+        logger.info("Measured index recall", k=k, queries=len(found), recall=recall, quantization=self.quantization)
+        return recall
+
+    def footprint(self) -> Dict[str, int]:
+        """Bytes of the full-precision matrix and of the in-memory int8 codes."""
+        return {
+            "vectors_bytes": int(self._vectors.nbytes) if self._vectors is not None else 0,
+            "codes_bytes": int(self._codes.nbytes) if self._codes is not None else 0,
+        }
+
+    def similarity_search_with_score(self,
+                                     query: str,
+                                     k: int = 4,
+                                     filters: Optional[Dict[str, Any]] = None) -> List[Tuple[Document, float]]:
+        return self.search_by_vectors(np.asarray([self.embedding.embed_query(query)]), k, filters)[0]
+
+    def retriever(self, k: int = 4, filters: Optional[Dict[str, Any]] = None) -> "NumpyRetriever":
+        return NumpyRetriever(index=self, k=k, filters=filters)
+
+    def as_retriever(self, search_kwargs: Optional[Dict[str, Any]] = None, **kwargs) -> "NumpyRetriever":
+        """``k`` and a ``filter`` of ``key=value`` pairs (not a Chroma ``where``) are read from ``search_kwargs``."""
+        search_kwargs = search_kwargs or {}
+        return self.retriever(search_kwargs.get("k", 4), search_kwargs.get("filter"))
+
+    def close(self):
+        """Release the in-memory arrays; a persisted index stays on disk."""
+        self._set_chunks([], [], [])
+        self._vectors = self._codes = self._scale = self._offset = None
+
+
+class NumpyRetriever(BaseRetriever):
+    """Retriever over a ``NumpyIndex``; ``batch`` embeds every query and searches them in one product."""
+
+    index: NumpyIndex
+    k: int = 4
+    filters: Optional[Dict[str, Any]] = None
+
+    class Config:
+        arbitrary_types_allowed = True
+
+    def _get_relevant_documents(self, query: str, *, run_manager: CallbackManagerForRetrieverRun) -> List[Document]:
+        return [document for document, _ in self.index.similarity_search_with_score(query, self.k, self.filters)]
+
+    def batch(self, inputs: List[str], config=None, **kwargs) -> List[List[Document]]:
+        vectors = np.asarray([self.index.embedding.embed_query(query) for query in inputs])
+        results = self.index.search_by_vectors(vectors, self.k, self.filters)
+        return [[document for document, _ in result] for result in results]